@@ -0,0 +1,303 @@
+"""
+批处理入口：对目录或通配符匹配的大量图像，用进程池并行执行实验中的处理链。
+- 主进程用少量线程解码图像：先读文件头得到形状、分配 SharedMemory，再用 imgio.decode 直接解码进共享内存，
+  只把块名、形状、dtype 发给工作进程，像素数据不经过 pickle；在途任务数有上限，内存占用与图像总数无关。
+  默认不经过 imgio 的解码缓存（一次性的大批量处理只会把进程内 LRU 与磁盘缓存填满）；
+  同一批图像需要反复处理时可用 --decode-cache 启用缓存。
+- 工作进程挂接共享内存、执行处理链并把输出 PNG（zlib 级别由 --png-level 指定）写到输出目录，返回分阶段耗时。
+- 噪声由 noise.stream(种子, 图像序号) 派生的独立随机流生成，输出与进程数、调度顺序无关，可逐位复现。
+- 单张图像失败不会中断整批，错误信息与 traceback 写入 JSON 报告。
+处理链：denoise（椒盐噪声 + 中值滤波扫描）、gamma（Gamma 扫描）、notch（FFT 陷波）、
+color（HSI / YCrCb 分量）。
+用法：python batch.py "jpg/素材/*.jpg" --pipeline denoise:3,7,11,15 --workers 4 --out output/batch
+"""
+
+from __future__ import annotations
+
+import argparse
+import glob
+import json
+import os
+import time
+import traceback
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from dataclasses import asdict, dataclass, field
+from multiprocessing import get_all_start_methods, get_context, shared_memory
+from pathlib import Path
+from typing import Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from imgio import PNG_COMPRESS_LEVEL, decode, image_shape, load_image, save_png
+from noise import add_salt_pepper, stream
+
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff"}
+
+
+# ========== 处理链 ==========
+def _denoise(gray: np.ndarray, params: Sequence[float], rng: np.random.Generator) -> Dict[str, np.ndarray]:
+    from median import median_filter
+
+    noisy = add_salt_pepper(gray, amount=0.03, seed=rng)
+    outputs = {"sp": noisy}
+    for k in params:
+        outputs[f"median_{int(k)}"] = median_filter(noisy, int(k))
+    return outputs
+
+
+def _gamma(gray: np.ndarray, params: Sequence[float], rng: np.random.Generator) -> Dict[str, np.ndarray]:
+    from experiment2 import gamma_transform_many
+
+    return dict(zip((f"gamma_{g}" for g in params), gamma_transform_many(gray, list(params), c=1.5)))
+
+
+def _notch(gray: np.ndarray, params: Sequence[float], rng: np.random.Generator) -> Dict[str, np.ndarray]:
+    from experiment4 import notch_filter
+
+    num_peaks = int(params[0]) if params else 4
+    filtered, mask = notch_filter(gray, num_peaks=num_peaks, radius=6, exclude_r=12)
+    return {"notch": filtered, "notch_mask": mask}
+
+
+def _color(rgb: np.ndarray, params: Sequence[float], rng: np.random.Generator) -> Dict[str, np.ndarray]:
+    from experiment2 import rgb_to_hsi, rgb_to_ycrcb
+
+    h, s, i = rgb_to_hsi(rgb)
+    y, cr, cb = rgb_to_ycrcb(rgb)
+    return {"hsi_h": h, "hsi_s": s, "hsi_i": i, "y": y, "cr": cr, "cb": cb}
+
+
+@dataclass
+class Pipeline:
+    name: str
+    mode: str
+    # (图像, 参数, 该图像的随机流) -> {输出名: 结果}
+    run: Callable[[np.ndarray, Sequence[float], np.random.Generator], Dict[str, np.ndarray]]
+    defaults: Tuple[float, ...] = ()
+
+
+PIPELINES: Dict[str, Pipeline] = {
+    "denoise": Pipeline("denoise", "L", _denoise, (3, 7, 11, 15)),
+    "gamma": Pipeline("gamma", "L", _gamma, (0.5, 0.75, 1.5, 2.0)),
+    "notch": Pipeline("notch", "L", _notch, (4,)),
+    "color": Pipeline("color", "RGB", _color),
+}
+
+
+def parse_pipeline(spec: str) -> Tuple[Pipeline, Tuple[float, ...]]:
+    """解析 name[:p1,p2,...]，未给参数时使用处理链默认值。"""
+    name, _, args = spec.partition(":")
+    if name not in PIPELINES:
+        raise ValueError(f"未知处理链: {name}，可选 {sorted(PIPELINES)}")
+    pipeline = PIPELINES[name]
+    params = tuple(float(v) for v in args.split(",")) if args else pipeline.defaults
+    return pipeline, params
+
+
+# ========== 任务与结果 ==========
+@dataclass
+class Task:
+    index: int
+    path: str
+    shm_name: str
+    shape: Tuple[int, ...]
+    dtype: str
+    pipeline: str
+    params: Tuple[float, ...]
+    out_dir: str
+    seed: int
+    png_level: int = PNG_COMPRESS_LEVEL
+
+
+@dataclass
+class TaskResult:
+    path: str
+    ok: bool
+    decode_s: float = 0.0
+    process_s: float = 0.0
+    save_s: float = 0.0
+    outputs: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+    worker: Optional[int] = None
+
+
+def collect_inputs(spec: str) -> List[Path]:
+    """目录取其中的图像文件（不递归）；否则按 glob 模式匹配（支持 **）。"""
+    root = Path(spec)
+    if root.is_dir():
+        paths = [p for p in root.iterdir() if p.suffix.lower() in IMAGE_SUFFIXES]
+    else:
+        paths = [Path(p) for p in glob.glob(spec, recursive=True)]
+    return sorted(p for p in paths if p.is_file())
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """工作进程挂接共享内存。工作进程与主进程共用同一个资源跟踪器，挂接时的重复登记不产生新条目；
+    这里不能 unregister，否则会删掉主进程的登记，主进程 unlink 时跟踪器报 KeyError。"""
+    return shared_memory.SharedMemory(name=name)
+
+
+def _run_task(task: Task) -> TaskResult:
+    result = TaskResult(task.path, ok=False, worker=os.getpid())
+    shm = None
+    try:
+        shm = _attach(task.shm_name)
+        arr = np.ndarray(task.shape, dtype=np.dtype(task.dtype), buffer=shm.buf)
+        # 随机流只由 (种子, 图像序号) 决定，与分配到哪个工作进程、进程数多少无关
+        rng = stream(task.seed, task.index)
+        start = time.perf_counter()
+        outputs = PIPELINES[task.pipeline].run(arr, task.params, rng)
+        result.process_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        stem = Path(task.path).stem
+        for key, out in outputs.items():
+            dst = Path(task.out_dir) / f"{stem}_{key}.png"
+            save_png(out, dst, task.png_level)
+            result.outputs.append(str(dst))
+        result.save_s = time.perf_counter() - start
+        del arr, outputs
+        result.ok = True
+    except Exception:
+        result.error = traceback.format_exc()
+    finally:
+        if shm is not None:
+            shm.close()
+    return result
+
+
+def _decode_to_shm(
+    path: Path, mode: str, use_cache: bool = False
+) -> Tuple[shared_memory.SharedMemory, Tuple[int, ...], str, float]:
+    """解码进新分配的共享内存；use_cache 时经 imgio 的解码缓存（命中则跳过解码，但未命中时会写入缓存）。"""
+    start = time.perf_counter()
+    shape = image_shape(path, mode)
+    shm = shared_memory.SharedMemory(create=True, size=max(int(np.prod(shape)), 1))
+    try:
+        view = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+        if use_cache:
+            load_image(path, mode, out=view)
+        else:
+            decode(path, mode, out=view)
+    except BaseException:
+        shm.close()
+        shm.unlink()
+        raise
+    return shm, shape, np.dtype(np.uint8).str, time.perf_counter() - start
+
+
+# ========== 调度 ==========
+def run_batch(
+    paths: Sequence[Path],
+    pipeline_spec: str,
+    out_dir: Path,
+    workers: Optional[int] = None,
+    max_inflight: Optional[int] = None,
+    decode_threads: int = 2,
+    seed: int = 0,
+    png_level: int = PNG_COMPRESS_LEVEL,
+    decode_cache: bool = False,
+) -> List[TaskResult]:
+    """并行处理 paths，返回与 paths 同序的结果列表。"""
+    pipeline, params = parse_pipeline(pipeline_spec)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    max_inflight = max_inflight or 2 * workers
+    results: List[Optional[TaskResult]] = [None] * len(paths)
+    todo: Deque[int] = deque(range(len(paths)))
+    decoding: Dict[Future, int] = {}
+    running: Dict[Future, Tuple[int, shared_memory.SharedMemory, float]] = {}
+
+    # 主进程有解码线程在跑，fork 出的工作进程可能继承被持有的锁（如导入锁）而卡死，改用 forkserver
+    ctx = get_context("forkserver") if "forkserver" in get_all_start_methods() else None
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool, ThreadPoolExecutor(
+        max_workers=decode_threads
+    ) as decoders:
+        while todo or decoding or running:
+            while todo and len(decoding) + len(running) < max_inflight:
+                idx = todo.popleft()
+                decoding[decoders.submit(_decode_to_shm, paths[idx], pipeline.mode, decode_cache)] = idx
+            done, _ = wait(list(decoding) + list(running), return_when=FIRST_COMPLETED)
+            for fut in done:
+                if fut in decoding:
+                    idx = decoding.pop(fut)
+                    try:
+                        shm, shape, dtype, decode_s = fut.result()
+                    except Exception:
+                        results[idx] = TaskResult(str(paths[idx]), ok=False, error=traceback.format_exc())
+                        continue
+                    task = Task(
+                        idx, str(paths[idx]), shm.name, shape, dtype, pipeline.name, params, str(out_dir), seed, png_level
+                    )
+                    running[pool.submit(_run_task, task)] = (idx, shm, decode_s)
+                else:
+                    idx, shm, decode_s = running.pop(fut)
+                    try:
+                        res = fut.result()
+                    except Exception:
+                        res = TaskResult(str(paths[idx]), ok=False, error=traceback.format_exc())
+                    res.decode_s = decode_s
+                    results[idx] = res
+                    shm.close()
+                    shm.unlink()
+    return [r for r in results if r is not None]
+
+
+def summarize(results: Sequence[TaskResult], wall_s: float) -> Dict[str, object]:
+    ok = [r for r in results if r.ok]
+    return {
+        "images": len(results),
+        "succeeded": len(ok),
+        "failed": len(results) - len(ok),
+        "wall_s": round(wall_s, 4),
+        "images_per_s": round(len(results) / wall_s, 3) if wall_s > 0 else None,
+        "decode_s_total": round(sum(r.decode_s for r in results), 4),
+        "process_s_total": round(sum(r.process_s for r in ok), 4),
+        "save_s_total": round(sum(r.save_s for r in ok), 4),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="用进程池批量运行图像处理链")
+    parser.add_argument("inputs", help="图像目录或 glob 模式")
+    parser.add_argument("--pipeline", default="denoise", help=f"处理链 name[:参数]，可选 {sorted(PIPELINES)}")
+    parser.add_argument("--out", type=Path, default=Path(__file__).resolve().parent / "output" / "batch")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--max-inflight", type=int, default=None, help="同时驻留共享内存的图像数上限")
+    parser.add_argument("--seed", type=int, default=0, help="噪声根种子（每张图像按序号派生独立随机流）")
+    parser.add_argument("--report", type=Path, default=None, help="JSON 报告路径，默认写到输出目录")
+    parser.add_argument("--png-level", type=int, default=PNG_COMPRESS_LEVEL, choices=range(10), metavar="0-9")
+    parser.add_argument("--decode-cache", action="store_true", help="经 imgio 解码缓存读图（反复处理同一批图像时）")
+    args = parser.parse_args(argv)
+
+    paths = collect_inputs(args.inputs)
+    if not paths:
+        raise SystemExit(f"没有匹配的图像：{args.inputs}")
+    start = time.perf_counter()
+    results = run_batch(
+        paths,
+        args.pipeline,
+        args.out,
+        args.workers,
+        args.max_inflight,
+        seed=args.seed,
+        png_level=args.png_level,
+        decode_cache=args.decode_cache,
+    )
+    summary = summarize(results, time.perf_counter() - start)
+
+    report_path = args.report or args.out / "batch_report.json"
+    report = {"pipeline": args.pipeline, "summary": summary, "results": [asdict(r) for r in results]}
+    report_path.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    for r in results:
+        status = "OK " if r.ok else "ERR"
+        print(f"{status} {r.path}  decode {r.decode_s:.3f}s  process {r.process_s:.3f}s  save {r.save_s:.3f}s")
+        if r.error:
+            print("    " + r.error.strip().splitlines()[-1])
+    print(f"完成 {summary['succeeded']}/{summary['images']}，耗时 {summary['wall_s']}s，报告：{report_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+"""
+算子基准：在 256² … 8192² 的合成图像上扫描实验所用的核尺寸 / σ / 参数，
+记录每个 (算子, 参数, 尺寸) 的耗时（多次取最好）、吞吐（百万像素/秒）与峰值内存，写成 JSON。
+- 峰值内存用 tracemalloc 单独再跑一次测得（NumPy 的数组分配会登记到 tracemalloc），
+  是调用期间新增的峰值，不含输入本身；计时的那几次不开 tracemalloc，不受其开销影响。
+- 某个 (算子, 参数) 在较小尺寸上单次已超过 --max-seconds 时，跳过更大的尺寸。
+- 有按内容缓存的算子（Spectrum.of）在每次调用前清空缓存，测的是冷启动耗时；
+  warp_rotate 复用缓存的坐标映射，测的是每帧采样耗时，warp_rotate_cold 另测含建映射的耗时。
+- --baseline 给定时与之前保存的 JSON 逐项比较，耗时增加超过 --tolerance 的条目记为回归，
+  以退出码 1 结束，便于在改动前后各跑一次对照。
+用法：python bench.py [--sizes 256 1024 4096] [--only "median*"] [--out bench.json] [--baseline old.json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import fnmatch
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+ROOT = Path(__file__).resolve().parent
+DEFAULT_SIZES = (256, 512, 1024, 2048, 4096, 8192)
+# 耗时低于该值的条目不参与回归判断（计时抖动占比过大）
+MIN_COMPARE_SECONDS = 2e-3
+
+
+# ========== 用例 ==========
+@dataclass
+class Case:
+    """一个待测算子：make(param) 返回作用于图像的函数；mode 为 L（灰度）或 RGB。"""
+
+    name: str
+    make: Callable[[object], Callable[[np.ndarray], object]]
+    params: Tuple[object, ...] = (None,)
+    mode: str = "L"
+    reset: Optional[Callable[[], None]] = None
+
+
+def _clear_spectrum_cache() -> None:
+    import spectrum
+
+    spectrum._cache.clear()
+
+
+def _clear_warp_cache() -> None:
+    import warp
+
+    warp.clear_cache()
+
+
+def default_cases() -> List[Case]:
+    """实验中的热点函数与其实际使用的参数。"""
+    from canny import canny
+    from clahe import clahe
+    from colorspace import rgb_to_hsi
+    from convolution import convolve
+    from experiment1 import hist_equalize
+    from experiment2 import gamma_transform
+    from experiment4 import fft_decompose, notch_filter
+    from gradient import sobel_sharpen
+    from integral import mean_filter
+    from median import median_filter
+    from recursive_gaussian import gaussian_blur, gaussian_fir_kernel
+    from sweep import sweep
+    from warp import resize, rotate
+
+    return [
+        Case("convolve_gauss", lambda s: lambda img: convolve(img, gaussian_fir_kernel(s)), (0.8, 1.2, 1.8)),
+        Case("gaussian_blur", lambda s: lambda img: gaussian_blur(img, s), (0.8, 10, 50)),
+        Case("gaussian_blur_rgb", lambda s: lambda img: gaussian_blur(img, s), (1.2, 10), mode="RGB"),
+        Case("median_filter", lambda k: lambda img: median_filter(img, k), (3, 7, 11, 15)),
+        Case("mean_filter", lambda k: lambda img: mean_filter(img, k), (11, 15)),
+        Case("sobel_sharpen", lambda a: lambda img: sobel_sharpen(img, a), (0.6,)),
+        Case("canny", lambda s: lambda img: canny(img, 50, 150, s), (1.4,)),
+        Case("hist_equalize", lambda _: hist_equalize),
+        Case("clahe", lambda c: lambda img: clahe(img, clip_limit=c), (2.0,)),
+        Case("gamma_transform", lambda g: lambda img: gamma_transform(img, c=1.5, gamma=g), (0.5,)),
+        Case("rgb_to_hsi", lambda _: rgb_to_hsi, mode="RGB"),
+        Case("fft_decompose", lambda _: fft_decompose, reset=_clear_spectrum_cache),
+        Case("sweep_sobel_sharpen", lambda _: lambda img: sweep(sobel_sharpen, img, {"alpha": (0.3, 0.6, 1.0, 1.2)})),
+        Case("sweep_mean_filter", lambda _: lambda img: sweep(mean_filter, img, {"ksize": (5, 11, 15, 21)})),
+        Case("sweep_gamma", lambda _: lambda img: sweep(gamma_transform, img, {"gamma": (0.5, 0.75, 1.5, 2.0)}, c=1.5)),
+        Case("warp_rotate", lambda i: lambda img: rotate(img, 30, i), ("nearest", "bilinear", "bicubic")),
+        Case("warp_rotate_cold", lambda i: lambda img: rotate(img, 30, i), ("bilinear",), reset=_clear_warp_cache),
+        Case("warp_rotate90_rgb", lambda _: lambda img: rotate(img, 90, expand=True), mode="RGB"),
+        Case(
+            "resize_half",
+            lambda i: lambda img: resize(img, (img.shape[0] // 2, img.shape[1] // 2), i),
+            ("bilinear", "bicubic"),
+        ),
+        Case("notch_filter", lambda n: lambda img: notch_filter(img, num_peaks=n), (4,), reset=_clear_spectrum_cache),
+    ]
+
+
+@lru_cache(maxsize=4)
+def synthetic(size: int, mode: str) -> np.ndarray:
+    """确定性的合成图像：平滑渐变叠加随机纹理，避免全随机图像对某些算子过于有利或不利。
+    只缓存最近几张，8192² 的大图不会一直驻留。"""
+    rng = np.random.default_rng(size)
+    ramp = np.add.outer(np.arange(size), np.arange(size)) * (127.0 / max(2 * size - 2, 1))
+    shape = (size, size, 3) if mode == "RGB" else (size, size)
+    texture = rng.integers(0, 128, shape, dtype=np.uint8)
+    if mode == "RGB":
+        ramp = ramp[..., None]
+    return (texture + ramp.astype(np.uint8)).astype(np.uint8)
+
+
+# ========== 测量 ==========
+@dataclass
+class Result:
+    case: str
+    param: str
+    size: int
+    megapixels: float
+    seconds: float
+    mp_per_s: float
+    peak_mb: float
+
+    @property
+    def key(self) -> str:
+        return f"{self.case}[{self.param}]@{self.size}"
+
+
+def time_best(fn: Callable[[], object], repeat: int, reset: Optional[Callable[[], None]]) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        if reset:
+            reset()
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def peak_memory(fn: Callable[[], object], reset: Optional[Callable[[], None]]) -> int:
+    """调用期间相对调用前新增的峰值字节数。"""
+    if reset:
+        reset()
+    tracemalloc.start()
+    try:
+        base = tracemalloc.get_traced_memory()[0]
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return max(peak - base, 0)
+
+
+def run(cases: Sequence[Case], sizes: Sequence[int], repeat: int, max_seconds: float) -> List[Result]:
+    results: List[Result] = []
+    for case in cases:
+        for param in case.params:
+            fn = case.make(param)
+            label = "-" if param is None else str(param)
+            for size in sorted(sizes):
+                img = synthetic(size, case.mode)
+                call = lambda: fn(img)  # noqa: E731
+                seconds = time_best(call, repeat, case.reset)
+                peak = peak_memory(call, case.reset)
+                mp = size * size / 1e6
+                res = Result(case.name, label, size, mp, round(seconds, 6), round(mp / seconds, 3), round(peak / 2 ** 20, 2))
+                results.append(res)
+                print(f"{res.key:<32} {seconds * 1e3:10.2f}ms {res.mp_per_s:10.2f} MP/s {res.peak_mb:9.1f} MB")
+                if seconds > max_seconds and size < max(sizes):
+                    print(f"{'':<32} 超过 {max_seconds}s，跳过 {case.name}[{label}] 更大的尺寸")
+                    break
+    return results
+
+
+# ========== 存储与比较 ==========
+def environment() -> Dict[str, object]:
+    return {
+        "python": sys.version.split()[0],
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+
+def save(results: Sequence[Result], path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    data = {"environment": environment(), "results": [asdict(r) for r in results]}
+    path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+def load(path: Path) -> List[Result]:
+    data = json.loads(path.read_text(encoding="utf-8"))
+    return [Result(**r) for r in data["results"]]
+
+
+def compare(results: Sequence[Result], baseline: Sequence[Result], tolerance: float) -> List[str]:
+    """逐项对比耗时，打印变化并返回回归条目的键。"""
+    old = {r.key: r for r in baseline}
+    regressions: List[str] = []
+    print(f"\n{'条目':<32} {'基线':>10} {'当前':>10} {'变化':>8}")
+    for r in results:
+        base = old.get(r.key)
+        if base is None:
+            continue
+        ratio = r.seconds / base.seconds if base.seconds > 0 else float("inf")
+        flag = ""
+        if ratio > 1 + tolerance and r.seconds >= MIN_COMPARE_SECONDS:
+            flag = "  回归"
+            regressions.append(r.key)
+        elif ratio < 1 / (1 + tolerance):
+            flag = "  提升"
+        print(f"{r.key:<32} {base.seconds * 1e3:8.2f}ms {r.seconds * 1e3:8.2f}ms {ratio:7.2f}x{flag}")
+    missing = sorted(set(old) - {r.key for r in results})
+    if missing:
+        print(f"（基线中有 {len(missing)} 项本次未运行）")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="digital_image 算子基准")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--only", nargs="+", default=[], metavar="PATTERN", help="只运行名称匹配的算子（fnmatch 通配）")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-seconds", type=float, default=10.0, help="单次超过该耗时后不再测更大的尺寸")
+    parser.add_argument("--out", type=Path, default=ROOT / "output" / "bench.json")
+    parser.add_argument("--baseline", type=Path, default=None, help="用于比较的基线 JSON")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="耗时增加超过该比例记为回归")
+    args = parser.parse_args(argv)
+
+    cases = [c for c in default_cases() if not args.only or any(fnmatch.fnmatch(c.name, p) for p in args.only)]
+    if not cases:
+        raise SystemExit(f"没有匹配的算子：{args.only}")
+    results = run(cases, args.sizes, args.repeat, args.max_seconds)
+    save(results, args.out)
+    print(f"结果已写入：{args.out}")
+    if args.baseline is not None:
+        regressions = compare(results, load(args.baseline), args.tolerance)
+        if regressions:
+            print(f"回归 {len(regressions)} 项：" + ", ".join(regressions))
+            raise SystemExit(1)
+        print("无回归")
+
+
+if __name__ == "__main__":
+    main()
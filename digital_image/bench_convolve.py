@@ -0,0 +1,83 @@
+"""
+卷积引擎基准：在 512² / 2048² / 8192² 随机灰度图上比较 direct / separable / fft
+三种实现的耗时，并给出每种图像尺寸下的交叉点（最快方法切换时的核尺寸）。
+用法：python bench_convolve.py [--sizes 512 2048] [--ksizes 3 7 15 31] [--repeat 3]
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from convolution import choose_method, filter2d
+
+
+def gaussian_like(ksize: int) -> np.ndarray:
+    """可分离核（与 recursive_gaussian.gaussian_fir_kernel 同形）。"""
+    x = np.arange(ksize) - ksize // 2
+    g = np.exp(-(x ** 2) / (2 * (ksize / 6) ** 2))
+    kernel = np.outer(g, g)
+    return (kernel / kernel.sum()).astype(np.float32)
+
+
+def dense_random(ksize: int) -> np.ndarray:
+    """不可分离核（秩满）。"""
+    rng = np.random.default_rng(ksize)
+    kernel = rng.random((ksize, ksize))
+    return (kernel / kernel.sum()).astype(np.float32)
+
+
+def time_call(fn: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(sizes: List[int], ksizes: List[int], repeat: int, max_direct_ops: float) -> None:
+    for kind, make_kernel, methods in (
+        ("可分离核", gaussian_like, ("direct", "separable", "fft")),
+        ("不可分离核", dense_random, ("direct", "fft")),
+    ):
+        print(f"\n===== {kind} =====")
+        for size in sizes:
+            img = np.random.default_rng(size).integers(0, 256, (size, size), dtype=np.uint8)
+            print(f"\n图像 {size}x{size}")
+            print(f"{'k':>4} " + " ".join(f"{m:>11}" for m in methods) + "   fastest    auto")
+            fastest_prev = None
+            crossovers: List[str] = []
+            for k in ksizes:
+                kernel = make_kernel(k)
+                timings: Dict[str, float] = {}
+                for m in methods:
+                    if m == "direct" and size * size * k * k > max_direct_ops:
+                        continue
+                    timings[m] = time_call(lambda: filter2d(img, kernel, method=m), repeat)
+                fastest = min(timings, key=timings.get)
+                cells = " ".join(f"{timings[m] * 1e3:9.1f}ms" if m in timings else f"{'skip':>11}" for m in methods)
+                print(f"{k:>4} {cells}   {fastest:>9} {choose_method(kernel):>7}")
+                if fastest_prev is not None and fastest != fastest_prev:
+                    crossovers.append(f"{fastest_prev}→{fastest} @ k={k}")
+                fastest_prev = fastest
+            print("交叉点：" + ("; ".join(crossovers) if crossovers else "无"))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="卷积引擎交叉点基准")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[512, 2048, 8192])
+    parser.add_argument("--ksizes", type=int, nargs="+", default=[3, 5, 7, 9, 11, 15, 21, 31, 45, 63])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--max-direct-ops", type=float, default=2e9, help="direct 方法的 像素数×核面积 上限，超过则跳过"
+    )
+    args = parser.parse_args()
+    run(args.sizes, args.ksizes, args.repeat, args.max_direct_ops)
+
+
+if __name__ == "__main__":
+    main()
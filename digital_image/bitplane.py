@@ -0,0 +1,89 @@
+"""
+位平面分解：8 个位平面以打包位图保存，总大小与输入相同，每个平面只占输入的 1/8。
+- 把每行相邻 8 个像素看作一个 uint64（8×8 位矩阵），一次向量化的位矩阵转置（3 轮移位异或）
+  后，第 b 个字节恰好是平面 b 在这 8 个像素上的打包位（LSB 对应最左像素，即 bitorder="little"）。
+  整幅图像只过一遍，不生成 8 张全尺寸的中间图。
+- BitPlanes.packed_plane(b) 是打包位图的跨步视图（无拷贝）；plane(b) 才按需解包成 0/255 图像。
+- reconstruct(planes)：在打包表示上按字节屏蔽未选平面，再做一次同样的转置（转置是对合）
+  还原像素，例如 reconstruct((4, 5, 6, 7)) 为高 4 位重构。
+支持 (H, W) 与批量 (N, H, W) 的 uint8 输入。
+"""
+
+from __future__ import annotations
+
+from typing import Iterable, Tuple
+
+import numpy as np
+
+
+CHUNK_WORDS = 1 << 15
+
+_MASKS = (
+    (7, np.uint64(0x00AA00AA00AA00AA)),
+    (14, np.uint64(0x0000CCCC0000CCCC)),
+    (28, np.uint64(0x00000000F0F0F0F0)),
+)
+
+
+def _transpose8(words: np.ndarray) -> np.ndarray:
+    """原地转置每个 uint64 中的 8×8 位矩阵（第 j 字节第 i 位 ⇄ 第 i 字节第 j 位）。
+    按块处理，临时缓冲大小固定且留在缓存中。"""
+    flat = words.reshape(-1)
+    buf = np.empty(min(flat.size, CHUNK_WORDS), dtype=flat.dtype)
+    for start in range(0, flat.size, CHUNK_WORDS):
+        w = flat[start:start + CHUNK_WORDS]
+        t = buf[: w.size]
+        for shift, mask in _MASKS:
+            s = np.uint64(shift)
+            np.right_shift(w, s, out=t)
+            t ^= w
+            t &= mask
+            w ^= t
+            np.left_shift(t, s, out=t)
+            w ^= t
+    return words
+
+
+class BitPlanes:
+    """uint8 图像的打包位平面，packed 形状为 (..., H, ceil(W/8), 8)，packed[..., b] 为平面 b。"""
+
+    def __init__(self, packed: np.ndarray, shape: Tuple[int, ...]) -> None:
+        self.packed = packed
+        self.shape = shape
+
+    @classmethod
+    def from_gray(cls, gray: np.ndarray) -> "BitPlanes":
+        if gray.dtype != np.uint8:
+            raise TypeError(f"位平面分解需要 uint8 图像，收到 {gray.dtype}")
+        width = gray.shape[-1]
+        groups = -(-width // 8)
+        buf = np.zeros(gray.shape[:-1] + (groups * 8,), dtype=np.uint8)
+        buf[..., :width] = gray
+        _transpose8(buf.view("<u8"))
+        return cls(buf.reshape(gray.shape[:-1] + (groups, 8)), gray.shape)
+
+    def __len__(self) -> int:
+        return 8
+
+    def packed_plane(self, bit: int) -> np.ndarray:
+        """平面 bit 的打包位图视图 (..., H, ceil(W/8))，每字节 8 个像素，LSB 在左。"""
+        return self.packed[..., bit]
+
+    def plane(self, bit: int, scale: int = 255) -> np.ndarray:
+        """把平面 bit 解包为 0/scale 的 uint8 图像。"""
+        bits = np.unpackbits(self.packed_plane(bit), axis=-1, count=self.shape[-1], bitorder="little")
+        if scale != 1:
+            bits *= np.uint8(scale)
+        return bits
+
+    def __getitem__(self, bit: int) -> np.ndarray:
+        return self.plane(bit)
+
+    def reconstruct(self, planes: Iterable[int] = range(8)) -> np.ndarray:
+        """只用所选平面重构灰度图（未选平面视为 0）。"""
+        keep = np.zeros(8, dtype=np.uint8)
+        keep[list(planes)] = 0xFF
+        words = (self.packed & keep).reshape(self.packed.shape[:-2] + (-1,)).view("<u8")
+        pixels = _transpose8(words).view(np.uint8)
+        return np.ascontiguousarray(pixels[..., : self.shape[-1]])
+
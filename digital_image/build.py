@@ -0,0 +1,505 @@
+"""
+增量构建：把实验拆成若干阶段 (Stage) 组成的 DAG，按输入内容哈希跳过未变化的阶段。
+- 阶段键 = sha256(函数实际引用的源码, 参数, 输出文件名, 各输入的内容哈希)。源图输入取文件内容哈希，
+  上游阶段输入取其输出数组的内容哈希（记录在清单中），因此上游重算但结果不变时下游仍可跳过，
+  上游结果变了（如重新生成随机噪声）下游一定重算。
+- 键与清单中记录的相同、且输出文件都还在时直接跳过：不读上游、不计算、不重新编码。
+- 上游结果只在下游需要重算时才从输出文件读回（PNG 无损，读回的数组与当初内存中的一致）。
+- 报告按小节缓存 HTML 片段，片段键由小节内容和所含输出的内容哈希决定；只有变化的小节
+  重新生成缩略图，其余小节直接拼接缓存的片段。
+- --force 强制重算所选阶段；--only 用 fnmatch 模式按输出文件名选择阶段（自动带上过期的上游）。
+- 每个阶段按 decode（读入输入）/ compute / encode（编码写盘与内容哈希）分别插桩，报告组装记为 report；
+  报告末尾附耗时表，同名 _profile.json 为机器可读版本。--profile-memory 额外记录 tracemalloc 峰值。
+- 输出编码是多数实验的主要耗时：PNG 以 --png-level 指定的 zlib 级别保存（默认 imgio.PNG_COMPRESS_LEVEL），
+  --encode-workers > 1 时提交到线程池后台编码，下一个阶段的计算与之重叠；阶段的清单条目在其所有文件
+  写完后才记入，中途失败的阶段下次仍会重算。压缩级别不影响像素，不计入阶段键。
+  后台编码在工作线程内计时（墙钟与 time.thread_time），完成后记回所属阶段的 encode 记录；
+  “等待编码”一行（类别 wait）只记主线程等待的墙钟时间。
+清单与片段保存在 <输出目录>/.build/<构建名>*。
+阶段键中的代码部分只取阶段函数实际引用的代码：函数自身源码、它（经 __code__.co_names）引用的同模块
+函数 / 类 / 常量，以及它引用的本目录库模块及其（由 ast 解析、直接或间接）导入的本目录库模块的源文件哈希。
+因此底层模块（convolution、median 等）改动后用到它们的阶段自动重算，而实验脚本 main() 里改一个参数
+只重算该参数的阶段（参数另计入 stage.params）；构建设施（build、imgio、instrument、report）不计入。
+"""
+
+from __future__ import annotations
+
+import argparse
+import ast
+import fnmatch
+import hashlib
+import inspect
+import json
+import os
+import sys
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple, Union
+
+import numpy as np
+from PIL import Image
+
+from imgio import ENCODE_WORKERS, PNG_COMPRESS_LEVEL, file_digest, load_image, save_png
+from instrument import Profiler, StageRecord
+from report import ReportImage, ReportWriter
+
+
+ROOT = Path(__file__).resolve().parent
+# 构建设施模块：只影响调度、编码与报告，不影响阶段结果，不计入阶段键
+INFRA_MODULES = frozenset({"build", "imgio", "instrument", "report"})
+
+
+@dataclass(frozen=True)
+class Source:
+    """源图输入：以文件内容哈希 + 转换模式作为键。"""
+
+    path: Path
+    mode: str = "L"
+
+
+Input = Union[str, Source]
+
+
+@dataclass
+class Stage:
+    outputs: Tuple[str, ...]
+    fn: Callable[..., Any]
+    inputs: Tuple[Input, ...] = ()
+    params: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def name(self) -> str:
+        return self.outputs[0]
+
+
+@dataclass
+class Section:
+    title: str
+    items: Dict[str, str]  # 标签 -> 输出文件名
+    note: str = ""
+
+
+def passthrough(arr: np.ndarray) -> np.ndarray:
+    """原样输出：用于把源图另存为 PNG。"""
+    return arr
+
+
+# ========== 哈希 ==========
+def _hash(*parts: Any) -> str:
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=repr)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _value_digest(value: Any) -> str:
+    h = hashlib.sha256()
+    if isinstance(value, str):
+        h.update(value.encode("utf-8"))
+    else:
+        arr = np.ascontiguousarray(value)
+        h.update(f"{arr.dtype.str}{arr.shape}".encode("ascii"))
+        h.update(arr.data)
+    return h.hexdigest()
+
+
+@lru_cache(maxsize=None)
+def _local_imports(name: str) -> Tuple[str, ...]:
+    """本目录模块 name 的源码中 import 的本目录库模块（任意位置的 import / from … import，不含构建设施）。"""
+    tree = ast.parse((ROOT / f"{name}.py").read_text(encoding="utf-8"))
+    found: Set[str] = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            found.update(alias.name.split(".")[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and node.level == 0:
+            found.add(node.module.split(".")[0])
+    found -= INFRA_MODULES
+    return tuple(sorted(n for n in found if n != name and (ROOT / f"{n}.py").is_file()))
+
+
+@lru_cache(maxsize=None)
+def code_digest(name: str) -> str:
+    """本目录库模块 name 及其传递导入的本目录库模块的源文件内容哈希。"""
+    closure: Set[str] = set()
+    todo = [name]
+    while todo:
+        mod = todo.pop()
+        if mod not in closure:
+            closure.add(mod)
+            todo.extend(_local_imports(mod))
+    return _hash([(mod, file_digest(ROOT / f"{mod}.py")) for mod in sorted(closure)])
+
+
+def _local_module(obj: Any) -> Optional[str]:
+    """obj（模块，或函数 / 类）所在的本目录模块名；以脚本方式运行时 __module__ 为 __main__，按文件名还原。"""
+    module = obj if inspect.ismodule(obj) else sys.modules.get(getattr(obj, "__module__", None) or "")
+    path = getattr(module, "__file__", None)
+    if path is None:
+        return None
+    path = Path(path).resolve()
+    return path.stem if path.parent == ROOT else None
+
+
+def _code_names(code: Any) -> Set[str]:
+    """代码对象（含嵌套的 lambda / 推导式 / 内部函数）引用的全局名与属性名。"""
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if inspect.iscode(const):
+            names |= _code_names(const)
+    return names
+
+
+def _collect_code(fn: Callable[..., Any], sources: Dict[str, str], modules: Set[str]) -> None:
+    """收集 fn 的源码、它引用的同模块函数 / 类 / 常量，以及它引用的本目录库模块。"""
+    module = _local_module(fn) or getattr(fn, "__module__", "")
+    name = f"{module}.{getattr(fn, '__qualname__', repr(fn))}"
+    if name in sources:
+        return
+    try:
+        sources[name] = inspect.getsource(fn)
+    except (OSError, TypeError):
+        sources[name] = ""
+    code = getattr(fn, "__code__", None)
+    if code is None:
+        return
+    home = fn.__module__
+    for ref in sorted(_code_names(code)):
+        if ref not in fn.__globals__:
+            continue
+        obj = fn.__globals__[ref]
+        if isinstance(obj, np.ndarray):
+            sources[f"{module}:{ref}"] = _value_digest(obj)
+        elif isinstance(obj, (bool, int, float, str, bytes, tuple, frozenset, np.generic)):
+            sources[f"{module}:{ref}"] = repr(obj)
+        elif getattr(obj, "__module__", None) == home and (inspect.isfunction(obj) or inspect.isclass(obj)):
+            _collect_code(obj, sources, modules)
+        else:
+            local = _local_module(obj)
+            if local is not None and local not in INFRA_MODULES:
+                modules.add(local)
+
+
+def _fn_fingerprint(fn: Callable[..., Any]) -> str:
+    fn = getattr(fn, "func", fn)  # functools.partial
+    sources: Dict[str, str] = {}
+    modules: Set[str] = set()
+    _collect_code(fn, sources, modules)
+    return _hash(sorted(sources.items()), [(mod, code_digest(mod)) for mod in sorted(modules)])
+
+
+# ========== 输出读写 ==========
+def save_output(value: Any, dst: Path, png_level: int = PNG_COMPRESS_LEVEL) -> Path:
+    """按后缀保存阶段输出：.png 图片（png_level 为 zlib 级别）、.npy 数组、.svg / .html 文本，其余图片格式交给 Pillow。"""
+    suffix = dst.suffix.lower()
+    if suffix == ".npy":
+        np.save(dst, value)
+    elif suffix in (".svg", ".html"):
+        dst.write_text(value, encoding="utf-8")
+    elif suffix == ".png":
+        save_png(np.asarray(value), dst, png_level)
+    else:
+        Image.fromarray(np.asarray(value)).save(dst)
+    return dst
+
+
+def _timed_save(value: Any, dst: Path, png_level: int) -> Tuple[float, float]:
+    """后台编码任务：保存并返回本次的 (墙钟, 本线程 CPU) 秒数。"""
+    wall, cpu = time.perf_counter(), time.thread_time()
+    save_output(value, dst, png_level)
+    return time.perf_counter() - wall, time.thread_time() - cpu
+
+
+def load_output(src: Path) -> Any:
+    suffix = src.suffix.lower()
+    if suffix == ".npy":
+        return np.load(src, mmap_mode="r")
+    if suffix in (".svg", ".html"):
+        return src.read_text(encoding="utf-8")
+    with Image.open(src) as img:
+        return np.array(img)
+
+
+# ========== 构建 ==========
+class Build:
+    """声明阶段与报告小节，run() 只重算过期阶段，write_report() 只重建变化的小节。"""
+
+    def __init__(
+        self,
+        out_dir: Path,
+        name: str,
+        force: bool = False,
+        only: Sequence[str] = (),
+        profile_memory: bool = False,
+        png_level: int = PNG_COMPRESS_LEVEL,
+        encode_workers: int = ENCODE_WORKERS,
+    ) -> None:
+        self.out_dir = Path(out_dir)
+        self.name = name
+        self.force = force
+        self.only = tuple(only)
+        self.png_level = png_level
+        self.encode_workers = encode_workers
+        self.state_dir = self.out_dir / ".build"
+        self.manifest_path = self.state_dir / f"{name}.json"
+        self.fragment_dir = self.state_dir / f"{name}_fragments"
+        self.stages: List[Stage] = []
+        self.sections: List[Section] = []
+        self._producer: Dict[str, Stage] = {}
+        self._values: Dict[str, Any] = {}
+        self._keys: Dict[str, str] = {}
+        self._source_keys: Dict[Source, str] = {}
+        self.manifest: Dict[str, Dict[str, Any]] = self._load_manifest()
+        # 已计算、输出仍在后台编码的阶段条目；下游阶段的键要用到其中的内容哈希
+        self._encoding: Dict[str, Dict[str, Any]] = {}
+        self.ran: List[str] = []
+        self.skipped: List[str] = []
+        self.profiler = Profiler(trace_memory=profile_memory)
+
+    # ---------- 声明 ----------
+    def add(self, outputs: Union[str, Sequence[str]], fn: Callable[..., Any], *inputs: Input, **params: Any) -> Any:
+        """登记阶段 fn(*inputs, **params)；多个输出时 fn 返回等长元组。返回输出名供下游引用。"""
+        outs = (outputs,) if isinstance(outputs, str) else tuple(outputs)
+        for ref in inputs:
+            if isinstance(ref, str) and ref not in self._producer:
+                raise KeyError(f"阶段 {outs[0]} 的输入 {ref} 尚未声明")
+        for out in outs:
+            if out in self._producer:
+                raise ValueError(f"输出 {out} 重复声明")
+        stage = Stage(outs, fn, tuple(inputs), dict(params))
+        self.stages.append(stage)
+        for out in outs:
+            self._producer[out] = stage
+        return outs[0] if isinstance(outputs, str) else outs
+
+    def section(self, title: str, items: Dict[str, str], note: str = "") -> None:
+        for out in items.values():
+            if out not in self._producer:
+                raise KeyError(f"小节 {title} 引用了未声明的输出 {out}")
+        self.sections.append(Section(title, dict(items), note))
+
+    # ---------- 键与状态 ----------
+    def _load_manifest(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            return json.loads(self.manifest_path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _save_manifest(self) -> None:
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.manifest_path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(self.manifest, ensure_ascii=False, indent=1), encoding="utf-8")
+        os.replace(tmp, self.manifest_path)
+
+    def _input_key(self, ref: Input) -> str:
+        if isinstance(ref, Source):
+            if ref not in self._source_keys:
+                self._source_keys[ref] = _hash(file_digest(ref.path), ref.mode)
+            return self._source_keys[ref]
+        stage = self._producer[ref]
+        entry = self._encoding.get(stage.name) or self.manifest.get(stage.name, {})
+        digests = entry.get("digests", [])
+        index = stage.outputs.index(ref)
+        return digests[index] if index < len(digests) else ""
+
+    def _stage_key(self, stage: Stage) -> str:
+        inputs = [self._input_key(ref) for ref in stage.inputs]
+        return _hash(_fn_fingerprint(stage.fn), stage.params, stage.outputs, inputs)
+
+    def _up_to_date(self, stage: Stage) -> bool:
+        entry = self.manifest.get(stage.name)
+        if entry is None or entry.get("key") != self._keys[stage.name]:
+            return False
+        return all((self.out_dir / out).exists() for out in stage.outputs)
+
+    def _selected(self) -> Set[str]:
+        """--only 命中的阶段名；未给 --only 时为全部阶段。"""
+        if not self.only:
+            return {s.name for s in self.stages}
+        return {
+            s.name for s in self.stages if any(fnmatch.fnmatch(out, pat) for out in s.outputs for pat in self.only)
+        }
+
+    def _with_upstream(self, names: Set[str]) -> Set[str]:
+        needed: Set[str] = set()
+        todo = list(names)
+        while todo:
+            name = todo.pop()
+            if name in needed:
+                continue
+            needed.add(name)
+            stage = self._producer[name]
+            todo.extend(self._producer[ref].name for ref in stage.inputs if isinstance(ref, str))
+        return needed
+
+    # ---------- 执行 ----------
+    def _value(self, ref: Input) -> Any:
+        if isinstance(ref, Source):
+            return load_image(ref.path, ref.mode)
+        if ref not in self._values:
+            self._values[ref] = load_output(self.out_dir / ref)
+        return self._values[ref]
+
+    def _commit(self, stage: Stage, entry: Dict[str, Any], record: StageRecord) -> None:
+        for out in stage.outputs:
+            record.wrote(self.out_dir / out)
+        self.manifest[stage.name] = entry
+        self.ran.append(stage.name)
+
+    def _drain(self, pending: List[Tuple[Stage, Dict[str, Any], StageRecord, List["Future[Tuple[float, float]]"]]]) -> None:
+        """等待后台编码完成，把各文件的编码耗时记回所属阶段的 encode 记录并依次记入清单；
+        某个阶段写盘失败时其余阶段照常记入，最后抛出第一个错误。"""
+        error: Optional[BaseException] = None
+        with self.profiler.stage(f"{self.name} · 等待编码", "wait") as wait:
+            for stage, entry, record, futures in pending:
+                try:
+                    for fut in futures:
+                        wall, cpu = fut.result()
+                        record.wall_s += wall
+                        record.cpu_s += cpu
+                except Exception as exc:  # noqa: BLE001
+                    error = error or exc
+                    continue
+                self._commit(stage, entry, record)
+        wait.cpu_s = 0.0  # 等待期间的进程 CPU 是后台编码线程的，已记回各阶段
+        pending.clear()
+        self._encoding.clear()
+        if error is not None:
+            raise error
+
+    def run(self) -> None:
+        """按声明顺序（即拓扑序）检查并执行阶段。"""
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        selected = self._selected()
+        needed = self._with_upstream(selected)
+        pool = ThreadPoolExecutor(max_workers=self.encode_workers) if self.encode_workers > 1 else None
+        pending: List[Tuple[Stage, Dict[str, Any], StageRecord, List["Future[Tuple[float, float]]"]]] = []
+        try:
+            for stage in self.stages:
+                self._keys[stage.name] = self._stage_key(stage)
+                if stage.name not in needed:
+                    continue
+                forced = self.force and stage.name in selected
+                if not forced and self._up_to_date(stage):
+                    self.skipped.append(stage.name)
+                    continue
+                start = time.perf_counter()
+                with self.profiler.stage(stage.name, "decode"):
+                    args = [self._value(ref) for ref in stage.inputs]
+                with self.profiler.stage(stage.name, "compute"):
+                    result = stage.fn(*args, **stage.params)
+                values = (result,) if len(stage.outputs) == 1 else tuple(result)
+                if len(values) != len(stage.outputs):
+                    raise ValueError(f"阶段 {stage.name} 返回 {len(values)} 个结果，声明了 {len(stage.outputs)} 个输出")
+                with self.profiler.stage(stage.name, "encode") as record:
+                    futures: List["Future[Tuple[float, float]]"] = []
+                    for out, value in zip(stage.outputs, values):
+                        if pool is None:
+                            save_output(value, self.out_dir / out, self.png_level)
+                        else:
+                            futures.append(pool.submit(_timed_save, value, self.out_dir / out, self.png_level))
+                        self._values[out] = value
+                    digests = [_value_digest(v) for v in values]
+                entry = {
+                    "key": self._keys[stage.name],
+                    "outputs": list(stage.outputs),
+                    "digests": digests,
+                    "seconds": round(time.perf_counter() - start, 4),
+                }
+                if pool is None:
+                    self._commit(stage, entry, record)
+                else:
+                    self._encoding[stage.name] = entry
+                    pending.append((stage, entry, record, futures))
+        finally:
+            try:
+                if pending:
+                    self._drain(pending)
+            finally:
+                if pool is not None:
+                    pool.shutdown()
+                self._save_manifest()
+
+    # ---------- 报告 ----------
+    def _report_item(self, out: str) -> Optional[ReportImage]:
+        path = self.out_dir / out
+        value = self._values.get(out)
+        if isinstance(value, str):
+            return value
+        if isinstance(value, np.ndarray):
+            return value, path
+        if not path.exists():
+            return None
+        if path.suffix.lower() in (".svg", ".html"):
+            return path.read_text(encoding="utf-8")
+        return path
+
+    def _fragment_key(self, section: Section, report: ReportWriter) -> str:
+        items = [(label, out, self._input_key(out)) for label, out in section.items.items()]
+        return _hash(section.title, section.note, items, report.assets, report.thumb_size)
+
+    def write_report(self, path: Path, title: str, subtitle: str = "", assets: str = "external") -> Path:
+        """组装报告：小节片段未变化（且其缩略图文件仍在）时直接复用；末尾附本次运行的插桩表。"""
+        self.fragment_dir.mkdir(parents=True, exist_ok=True)
+        used: Set[str] = set()
+        rebuilt = 0
+        with ReportWriter(path, title, subtitle, assets=assets) as report:
+            with self.profiler.stage(Path(path).name, "report") as record:
+                for section in self.sections:
+                    key = self._fragment_key(section, report)
+                    cache = self.fragment_dir / f"{key[:32]}.json"
+                    used.add(cache.name)
+                    cached = json.loads(cache.read_text(encoding="utf-8")) if cache.exists() else None
+                    if cached is None or not all((report.path.parent / a).exists() for a in cached["assets"]):
+                        mark = len(report.assets_used)
+                        images: Dict[str, ReportImage] = {}
+                        for label, out in section.items.items():
+                            item = self._report_item(out)
+                            if item is not None:
+                                images[label] = item
+                        markup = report.fragment(section.title, images, section.note)
+                        cached = {"html": markup, "assets": report.assets_used[mark:]}
+                        cache.write_text(json.dumps(cached, ensure_ascii=False), encoding="utf-8")
+                        rebuilt += 1
+                    report.raw(cached["html"])
+            record.bytes_written += report.bytes_written
+            self._profile_section(report)
+        record.wrote(path)
+        self.profiler.dump(self.profile_path(path), build=self.name, ran=self.ran, skipped=self.skipped)
+        for stale in self.fragment_dir.glob("*.json"):
+            if stale.name not in used:
+                stale.unlink(missing_ok=True)
+        print(f"报告小节：重建 {rebuilt} / 复用 {len(self.sections) - rebuilt}")
+        return path
+
+    @staticmethod
+    def profile_path(report_path: Path) -> Path:
+        """插桩 JSON 的路径：与报告同目录，<报告名>_profile.json。"""
+        report_path = Path(report_path)
+        return report_path.with_name(f"{report_path.stem}_profile.json")
+
+    def _profile_section(self, report: ReportWriter) -> None:
+        """插桩表：按类别汇总 + 各阶段明细（跳过的阶段没有记录）。
+        报告 HTML 本身在表格之后才写完，其字节数只计入 JSON。"""
+        prof = self.profiler
+        note = f"本次执行 {len(self.ran)} 个阶段，跳过 {len(self.skipped)} 个；CPU 时间为整个进程的 CPU 时间。"
+        if not prof.trace_memory:
+            note += "峰值内存需用 --profile-memory 开启。"
+        report.raw(report.table_fragment("运行耗时与内存", prof.HEADER, prof.summary_rows() + prof.rows(), note))
+
+    def summary(self) -> str:
+        seconds = sum(self.manifest[name]["seconds"] for name in self.ran)
+        return f"阶段：执行 {len(self.ran)} / 跳过 {len(self.skipped)}，计算耗时 {seconds:.2f}s"
+
+
+def arg_parser(description: str) -> argparse.ArgumentParser:
+    """实验脚本共用的命令行参数。"""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--force", action="store_true", help="忽略缓存，重算所选阶段")
+    parser.add_argument("--only", nargs="+", default=(), metavar="PATTERN", help="只构建输出文件名匹配的阶段（fnmatch）")
+    parser.add_argument("--profile-memory", action="store_true", help="用 tracemalloc 记录各阶段的内存峰值（较慢）")
+    parser.add_argument(
+        "--png-level", type=int, default=PNG_COMPRESS_LEVEL, choices=range(10), metavar="0-9", help="输出 PNG 的 zlib 压缩级别"
+    )
+    parser.add_argument("--encode-workers", type=int, default=ENCODE_WORKERS, metavar="N", help="并行编码输出的线程数，1 为顺序编码")
+    return parser
@@ -0,0 +1,242 @@
+"""
+限制对比度的自适应直方图均衡化（CLAHE），沿用 lut.py 的查表思路：每个网格块一张 256 项表，
+像素按所在位置在相邻 4 块的表之间双线性插值。各步都按整幅数组向量化，Python 循环只在行条带上：
+- tile_histograms：所有块的直方图一次统计。块带 (th, W) 的每个像素加上所在块列的偏移 tx·256，
+  对行条带做一次 bincount 就得到该带所有块的直方图；条带按 planes.STRIP_ELEMS 切分，索引临时数组留在缓存内。
+  宽高不能被网格整除时，先在右侧 / 下方 reflect 填充到整数倍（与 OpenCV 相同）。
+- clip_histograms：超出上限的计数平均分给 256 个桶，余数按步长 256 // 余数从 0 号桶起逐个加 1（OpenCV 的规则），
+  整批在 (块数, 256) 数组上用掩码完成，不逐块循环。
+- tile_luts：裁剪后直方图的累积和 × 255 / 块面积，四舍五入得到各块的表。
+- interpolate_luts：块中心 (i + 0.5)·tile 之间的行共用同一对上下块行。对每个列格（两个块中心之间），
+  把 左上 / 右上 / 左下 / 右下 4 张表按 lut.apply_many 的方式打包成一张 uint64 表（每项 4 个 16 位通道），
+  每个像素只做一次 take。混合用 7 位定点权重在打包值上直接做（SWAR）：乘一次列权重同时完成上下两行的
+  左右混合，再乘一次行权重完成上下混合，之后移位取整。全程是整型运算，避免 uint8 与 float32
+  混合运算的逐元素类型转换，比浮点双线性快约 3 倍。权重量化到 1/128，与浮点插值最多差 1 个灰度级。
+上限 clip_limit 与 OpenCV 一致，是相对平均桶高（块面积 / 256）的倍数；clip_limit ≤ 0 时不裁剪（普通 AHE）。
+(H,W,C) / (N,H,W[,C]) 输入按 planes.py 换轴后逐平面处理，结果按行条带直接写入输入布局。
+clahe_reference 是逐块、逐像素的直接实现，main() 用它核对 clahe 的结果并测耗时。
+用法：python clahe.py [--size 4096] [--clip 2.0] [--grid 8 8]
+"""
+
+from __future__ import annotations
+
+import argparse
+import math
+import time
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from planes import as_planes, empty_output, strips
+
+
+Grid = Tuple[int, int]
+
+# 直方图桶数（uint8）
+BINS = 256
+# 插值权重的定点精度：两个方向的权重都量化到 1/128
+WEIGHT_BITS = 7
+WEIGHT_ONE = 1 << WEIGHT_BITS
+_LANE_MASK = np.uint64(0x0000FFFF0000FFFF)
+_SHIFT = np.uint64(32 + 2 * WEIGHT_BITS)
+_ROUND = np.uint64(1 << (32 + 2 * WEIGHT_BITS - 1))
+
+
+# ========== 直方图 ==========
+def _pad_to_grid(gray: np.ndarray, grid: Grid) -> np.ndarray:
+    """右侧 / 下方 reflect 填充到网格的整数倍；已整除时原样返回。"""
+    h, w = gray.shape
+    ph, pw = -h % grid[0], -w % grid[1]
+    if ph == 0 and pw == 0:
+        return gray
+    if ph >= h or pw >= w:
+        raise ValueError(f"图像 {gray.shape} 太小，无法划分为 {grid} 个块")
+    return np.pad(gray, ((0, ph), (0, pw)), mode="reflect")
+
+
+def tile_histograms(gray: np.ndarray, grid: Grid) -> np.ndarray:
+    """uint8 图像各块的直方图，(ny, nx, 256) int64；gray 的宽高需为网格的整数倍。"""
+    ny, nx = grid
+    h, w = gray.shape
+    if h % ny or w % nx:
+        raise ValueError(f"图像 {gray.shape} 不能被网格 {grid} 整除，请先填充")
+    th, tw = h // ny, w // nx
+    # 偏移后的索引不超过 2^16 时用 uint16，加法与 bincount 内部的类型转换都更快
+    offsets = np.repeat(np.arange(nx, dtype=np.uint16 if nx * BINS <= 1 << 16 else np.intp) * BINS, tw)
+    hist = np.zeros((ny, nx * BINS), dtype=np.int64)
+    for ty in range(ny):
+        band = gray[ty * th:(ty + 1) * th]
+        for y0, y1 in strips(th, w):
+            hist[ty] += np.bincount((band[y0:y1] + offsets).reshape(-1), minlength=nx * BINS)
+    return hist.reshape(ny, nx, BINS)
+
+
+def clip_histograms(hist: np.ndarray, limit: int) -> np.ndarray:
+    """按 OpenCV 的规则裁剪并重新分配超出 limit 的计数，hist 为 (…, 256)，总数不变。"""
+    clipped = np.minimum(hist, limit)
+    excess = (hist - clipped).sum(axis=-1, keepdims=True)
+    batch, residual = np.divmod(excess, BINS)
+    clipped += batch
+    step = np.maximum(BINS // np.maximum(residual, 1), 1)
+    bins = np.arange(BINS)
+    clipped += (bins % step == 0) & (bins // step < residual)
+    return clipped
+
+
+def tile_luts(hist: np.ndarray, area: int, clip_limit: float) -> np.ndarray:
+    """各块的均衡化表，(…, 256) uint8。"""
+    if clip_limit > 0:
+        hist = clip_histograms(hist, max(int(clip_limit * area / BINS), 1))
+    cdf = np.cumsum(hist, axis=-1, dtype=np.float32)
+    cdf *= np.float32(255.0 / area)
+    np.rint(cdf, out=cdf)
+    return np.clip(cdf, 0, 255).astype(np.uint8)
+
+
+# ========== 插值 ==========
+def _interp_axis(n: int, tile: int, tiles: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """沿一个轴的 (左/上块号, 右/下块号, 右/下块定点权重 0..WEIGHT_ONE)，块中心取 (i + 0.5)·tile。
+    块号未钳位前的值为 i1，超出首尾块中心的像素两侧取同一块。"""
+    f = (np.arange(n, dtype=np.float64) + 0.5) / tile - 0.5
+    i1 = np.floor(f).astype(np.intp)
+    weight = np.rint((f - i1) * WEIGHT_ONE).astype(np.int64)
+    return i1, np.minimum(i1 + 1, tiles - 1), weight
+
+
+def interpolate_luts(gray: np.ndarray, luts: np.ndarray, tile: Tuple[int, int], out: np.ndarray) -> np.ndarray:
+    """gray 按所在位置在相邻 4 块的表之间双线性插值，写入 out（可以是换轴视图）并返回。"""
+    ny, nx = luts.shape[:2]
+    h, w = gray.shape
+    ty1, ty2, wy = _interp_axis(h, tile[0], ny)
+    tx1, _, wx = _interp_axis(w, tile[1], nx)
+    # 列所在的格（两个块中心之间）决定左右两块：格 c 的左块 max(c-1, 0)、右块 min(c, nx-1)
+    cell_base = ((tx1 + 1) * BINS).astype(np.int32)
+    cells = np.arange(nx + 1)
+    left, right = np.maximum(cells - 1, 0), np.minimum(cells, nx - 1)
+    one = np.uint64(WEIGHT_ONE)
+    x_mul = ((one - wx.astype(np.uint64)) << np.uint64(16)) | wx.astype(np.uint64)
+    y_mul = ((one - wy.astype(np.uint64)) << np.uint64(32)) | wy.astype(np.uint64)
+    n = next(strips(h, w))[1] * w
+    idx = np.empty(n, dtype=np.int32)
+    acc = np.empty(n, dtype=np.uint64)
+    # 上下块行相同的连续行为一段，段内共用一张打包表
+    y1 = np.maximum(ty1, 0)
+    starts = np.flatnonzero(np.diff(ty1, prepend=-2))
+    for s, start in enumerate(starts):
+        stop = starts[s + 1] if s + 1 < len(starts) else h
+        top, bottom = luts[y1[start]].astype(np.uint64), luts[ty2[start]].astype(np.uint64)
+        # 每项 4 个 16 位通道：左上 | 右上 << 16 | 左下 << 32 | 右下 << 48
+        packed = top[left] | top[right] << np.uint64(16) | bottom[left] << np.uint64(32) | bottom[right] << np.uint64(48)
+        packed = packed.reshape(-1)
+        for y0, y_end in strips(stop - start, w):
+            y0, y_end = y0 + start, y_end + start
+            shape = (y_end - y0, w)
+            i, a = idx[:shape[0] * w].reshape(shape), acc[:shape[0] * w].reshape(shape)
+            np.add(gray[y0:y_end], cell_base, out=i)
+            np.take(packed, i, out=a, mode="clip")
+            # 左右混合：a 的两个 32 位字各为 (左 | 右 << 16)，乘 ((1-wx) << 16 | wx) 后第 16 位起即混合值；
+            # 权重和为 128 时各项都小于 2^16，上字溢出到下字的部分也不会进位到结果所在的位
+            a *= x_mul
+            a >>= np.uint64(16)
+            a &= _LANE_MASK
+            # 上下混合：a = 上 | 下 << 32，乘 ((1-wy) << 32 | wy) 后高 32 位即 上·(1-wy) + 下·wy
+            a *= y_mul[y0:y_end, None]
+            a += _ROUND
+            a >>= _SHIFT
+            out[y0:y_end] = a
+    return out
+
+
+# ========== 对外接口 ==========
+def _clahe_plane(gray: np.ndarray, clip_limit: float, grid: Grid, out: np.ndarray) -> np.ndarray:
+    padded = _pad_to_grid(gray, grid)
+    tile = (padded.shape[0] // grid[0], padded.shape[1] // grid[1])
+    luts = tile_luts(tile_histograms(padded, grid), tile[0] * tile[1], clip_limit)
+    return interpolate_luts(gray, luts, tile, out)
+
+
+def clahe(gray: np.ndarray, clip_limit: float = 2.0, grid: Grid = (8, 8)) -> np.ndarray:
+    """对 uint8 图像做 CLAHE，grid 为 (行块数, 列块数)，返回布局与输入相同的 uint8。"""
+    if gray.dtype != np.uint8:
+        raise TypeError(f"CLAHE 只支持 uint8 图像，收到 {gray.dtype}")
+    if grid[0] < 1 or grid[1] < 1:
+        raise ValueError(f"网格需为正整数: {grid}")
+    planes, channels_last = as_planes(gray)
+    out = empty_output(planes.shape, np.uint8, channels_last)
+    # 通道在最后时 out_planes 是跨步视图，插值按行条带直接写入，不另做换轴拷贝
+    out_planes = np.moveaxis(out, -1, -3) if channels_last else out
+    for idx in np.ndindex(planes.shape[:-2]):
+        _clahe_plane(planes[idx], clip_limit, grid, out_planes[idx])
+    return out
+
+
+def clahe_reference(gray: np.ndarray, clip_limit: float = 2.0, grid: Grid = (8, 8)) -> np.ndarray:
+    """逐块、逐像素的直接实现，只用于核对 clahe 的结果（很慢，只适合小图）。"""
+    padded = _pad_to_grid(gray, grid)
+    ny, nx = grid
+    th, tw = padded.shape[0] // ny, padded.shape[1] // nx
+    area = th * tw
+    limit = max(int(clip_limit * area / BINS), 1)
+    luts = np.empty((ny, nx, BINS), dtype=np.uint8)
+    for ty in range(ny):
+        for tx in range(nx):
+            hist = np.bincount(padded[ty * th:(ty + 1) * th, tx * tw:(tx + 1) * tw].ravel(), minlength=BINS)
+            if clip_limit > 0:
+                excess = int(np.maximum(hist - limit, 0).sum())
+                hist = np.minimum(hist, limit) + excess // BINS
+                residual = excess % BINS
+                step = max(BINS // residual, 1) if residual else 1
+                i = 0
+                while i < BINS and residual > 0:
+                    hist[i] += 1
+                    i += step
+                    residual -= 1
+            cdf = np.cumsum(hist).astype(np.float32) * np.float32(255.0 / area)
+            luts[ty, tx] = np.clip(np.rint(cdf), 0, 255)
+    out = np.empty_like(gray)
+    one = WEIGHT_ONE
+    for y in range(gray.shape[0]):
+        fy = (y + 0.5) / th - 0.5
+        ya = int(np.rint((fy - math.floor(fy)) * one))
+        y1, y2 = max(math.floor(fy), 0), min(math.floor(fy) + 1, ny - 1)
+        for x in range(gray.shape[1]):
+            fx = (x + 0.5) / tw - 0.5
+            xa = int(np.rint((fx - math.floor(fx)) * one))
+            x1, x2 = max(math.floor(fx), 0), min(math.floor(fx) + 1, nx - 1)
+            v = gray[y, x]
+            top = int(luts[y1, x1, v]) * (one - xa) + int(luts[y1, x2, v]) * xa
+            bottom = int(luts[y2, x1, v]) * (one - xa) + int(luts[y2, x2, v]) * xa
+            out[y, x] = (top * (one - ya) + bottom * ya + one * one // 2) // (one * one)
+    return out
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="CLAHE 耗时与正确性检查")
+    parser.add_argument("--size", type=int, default=4096)
+    parser.add_argument("--clip", type=float, default=2.0)
+    parser.add_argument("--grid", type=int, nargs=2, default=(8, 8), metavar=("NY", "NX"))
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+    grid = (args.grid[0], args.grid[1])
+
+    rng = np.random.default_rng(0)
+    small = rng.integers(0, 256, (203, 317), dtype=np.uint8)
+    same = np.array_equal(clahe(small, args.clip, grid), clahe_reference(small, args.clip, grid))
+    print(f"与逐像素实现一致：{same}")
+
+    ramp = np.add.outer(np.arange(args.size), np.arange(args.size)) * (127.0 / (2 * args.size - 2))
+    img = (rng.integers(0, 128, (args.size, args.size)) + ramp).astype(np.uint8)
+    best = float("inf")
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        clahe(img, args.clip, grid)
+        best = min(best, time.perf_counter() - start)
+    start = time.perf_counter()
+    img.copy()
+    copy_s = time.perf_counter() - start
+    mp = args.size * args.size / 1e6
+    print(f"{args.size}² 网格 {grid}：{best * 1e3:.1f}ms，{mp / best:.1f} MP/s（整幅拷贝 {copy_s * 1e3:.1f}ms）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,400 @@
+"""
+颜色空间转换：uint8 RGB ⇄ HSI / YCrCb / HSV / Lab，输入形状为 (..., 3)，支持 (H, W, 3) 与 (N, H, W, 3)。
+- 按像素分块处理：每块转为 (3, m) 的 float32 工作区，块内所有中间量写入预分配缓冲（out=），
+  不生成整图规模的临时数组，峰值内存约为输入 + 输出（≈ 2× 输入）外加与图像大小无关的工作区。
+- 线性空间（YCrCb，以及 Lab 中的 RGB→XYZ）用 3×3 矩阵乘法；sRGB 线性化用 256 项查表。
+- 8 位编码：HSI 的 H 为 [0, 2π) → 0-255，S、I 为 0-255；HSV 的 H 为 [0, 360) → 0-255；
+  YCrCb 为 BT.601 全范围；Lab 与 OpenCV 8 位约定相同（L·255/100，a+128，b+128）。
+  编码时四舍五入，逆变换后的往返误差见 roundtrip_error / main()。
+用法：python colorspace.py [图像路径]
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+
+CHUNK_PIXELS = 1 << 16
+TWO_PI = 2.0 * np.pi
+EPS = 1e-6
+
+Kernel = Callable[[np.ndarray, "_Workspace"], np.ndarray]
+
+
+class _Workspace:
+    """单块的 float32 缓冲：x 为输入 (3, m)，y 为输出 (3, m)，t0..t3 为逐像素标量临时量。"""
+
+    def __init__(self, size: int) -> None:
+        self._x = np.empty((3, size), dtype=np.float32)
+        self._y = np.empty((3, size), dtype=np.float32)
+        self._t = np.empty((4, size), dtype=np.float32)
+        self._mask = np.empty((2, size), dtype=bool)
+        self.m = size
+
+    def resize(self, m: int) -> None:
+        self.m = m
+
+    @property
+    def x(self) -> np.ndarray:
+        return self._x[:, : self.m]
+
+    @property
+    def y(self) -> np.ndarray:
+        return self._y[:, : self.m]
+
+    def t(self, i: int) -> np.ndarray:
+        return self._t[i, : self.m]
+
+    def mask(self, i: int) -> np.ndarray:
+        return self._mask[i, : self.m]
+
+
+def _run(kernel: Kernel, src: np.ndarray, out: Optional[np.ndarray]) -> np.ndarray:
+    """逐块：uint8 → float32 工作区 → kernel → 四舍五入、裁剪 → uint8 输出。"""
+    if src.dtype != np.uint8 or src.shape[-1] != 3:
+        raise ValueError(f"需要 (..., 3) 的 uint8 数组，收到 {src.dtype} {src.shape}")
+    if out is None:
+        out = np.empty(src.shape, dtype=np.uint8)
+    elif out.shape != src.shape or out.dtype != np.uint8 or not out.flags.c_contiguous:
+        raise ValueError("out 必须是与输入同形状、C 连续的 uint8 数组")
+    src_px = np.ascontiguousarray(src).reshape(-1, 3)
+    out_px = out.reshape(-1, 3)
+    n = src_px.shape[0]
+    ws = _Workspace(min(CHUNK_PIXELS, max(n, 1)))
+    for start in range(0, n, CHUNK_PIXELS):
+        stop = min(n, start + CHUNK_PIXELS)
+        ws.resize(stop - start)
+        x = ws.x
+        x[...] = src_px[start:stop].T
+        y = kernel(x, ws)
+        np.rint(y, out=y)
+        np.clip(y, 0, 255, out=y)
+        out_px[start:stop] = y.T
+    return out
+
+
+def split(arr: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """按最后一维拆成三个分量视图。"""
+    return arr[..., 0], arr[..., 1], arr[..., 2]
+
+
+# ========== YCrCb（线性） ==========
+_YCRCB = np.array(
+    [
+        [0.299, 0.587, 0.114],
+        [0.5, -0.418688, -0.081312],
+        [-0.168736, -0.331264, 0.5],
+    ],
+    dtype=np.float32,
+)
+_YCRCB_INV = np.linalg.inv(_YCRCB.astype(np.float64)).astype(np.float32)
+_YCRCB_OFFSET = np.array([0.0, 128.0, 128.0], dtype=np.float32)[:, None]
+
+
+def _ycrcb_fwd(x: np.ndarray, ws: _Workspace) -> np.ndarray:
+    y = np.matmul(_YCRCB, x, out=ws.y)
+    y += _YCRCB_OFFSET
+    return y
+
+
+def _ycrcb_inv(x: np.ndarray, ws: _Workspace) -> np.ndarray:
+    x -= _YCRCB_OFFSET
+    return np.matmul(_YCRCB_INV, x, out=ws.y)
+
+
+# ========== HSI ==========
+def _hsi_fwd(x: np.ndarray, ws: _Workspace) -> np.ndarray:
+    r, g, b = x
+    y = ws.y
+    rg, rb, tmp, mn = ws.t(0), ws.t(1), ws.t(2), ws.t(3)
+    np.subtract(r, g, out=rg)
+    np.subtract(r, b, out=rb)
+    # den = sqrt((r-g)² + (r-b)(g-b)) + eps，num = ((r-g) + (r-b)) / 2
+    np.subtract(g, b, out=tmp)
+    np.multiply(tmp, rb, out=tmp)
+    np.multiply(rg, rg, out=mn)
+    np.add(tmp, mn, out=tmp)
+    np.sqrt(tmp, out=tmp)
+    tmp += EPS * 255.0
+    np.add(rg, rb, out=rg)
+    rg *= 0.5
+    np.divide(rg, tmp, out=rg)
+    np.clip(rg, -1.0, 1.0, out=rg)
+    h = np.arccos(rg, out=y[0])
+    flip = np.greater(b, g, out=ws.mask(0))
+    np.subtract(TWO_PI, h, out=h, where=flip)
+    h *= 255.0 / TWO_PI
+
+    np.minimum(r, g, out=mn)
+    np.minimum(mn, b, out=mn)
+    i = np.add(r, g, out=y[2])
+    i += b
+    i /= 3.0
+    # s = 1 - min / i（i 足够大时），否则 0
+    s = y[1]
+    s.fill(0.0)
+    valid = np.greater(i, EPS * 255.0, out=ws.mask(0))
+    np.divide(mn, i, out=s, where=valid)
+    np.subtract(1.0, s, out=s, where=valid)
+    s *= 255.0
+    return y
+
+
+def _hsi_inv(x: np.ndarray, ws: _Workspace) -> np.ndarray:
+    hq, sq, i = x
+    y = ws.y
+    h, c, sector = ws.t(0), ws.t(1), ws.t(2)
+    np.multiply(hq, TWO_PI / 255.0, out=h)
+    sq /= 255.0
+    # 扇区 k = floor(h / (2π/3))，h' = h - k·2π/3
+    np.floor_divide(h, TWO_PI / 3.0, out=sector)
+    np.clip(sector, 0, 2, out=sector)
+    np.subtract(h, sector * (TWO_PI / 3.0), out=h)
+    # a = i(1 - s)，c = i(1 + s·cos h' / cos(π/3 - h'))，d = 3i - a - c
+    np.subtract(np.pi / 3.0, h, out=c)
+    np.cos(c, out=c)
+    np.cos(h, out=h)
+    np.divide(h, c, out=c)
+    np.multiply(c, sq, out=c)
+    c += 1.0
+    c *= i
+    a = ws.t(3)
+    np.subtract(1.0, sq, out=a)
+    a *= i
+    vals = y
+    vals[0] = c
+    vals[2] = a
+    np.multiply(i, 3.0, out=vals[1])
+    vals[1] -= a
+    vals[1] -= c
+    # 扇区 0：(r, g, b) = (c, d, a)；扇区 k 时整体循环右移 k 位
+    idx = (np.arange(3, dtype=np.intp)[:, None] - sector.astype(np.intp)[None, :]) % 3
+    out = np.take_along_axis(vals, idx, axis=0)
+    x[...] = out
+    return x
+
+
+# ========== HSV ==========
+_HSV_SELECT = np.array(
+    # 行为扇区 0-5，列为 (r, g, b) 取自 [v, p, q, t] 中的哪一个
+    [[0, 3, 1], [2, 0, 1], [1, 0, 3], [1, 2, 0], [3, 1, 0], [0, 1, 2]],
+    dtype=np.intp,
+)
+
+
+def _hsv_fwd(x: np.ndarray, ws: _Workspace) -> np.ndarray:
+    r, g, b = x
+    y = ws.y
+    v, s, h = y[2], y[1], y[0]
+    c, mn = ws.t(0), ws.t(1)
+    np.maximum(r, g, out=v)
+    np.maximum(v, b, out=v)
+    np.minimum(r, g, out=mn)
+    np.minimum(mn, b, out=mn)
+    np.subtract(v, mn, out=c)
+    s.fill(0.0)
+    np.divide(c, v, out=s, where=v > 0)
+    s *= 255.0
+
+    # h（单位：60°）：max 为 r → (g-b)/c，g → (b-r)/c + 2，b → (r-g)/c + 4
+    h.fill(0.0)
+    nz = np.greater(c, 0, out=ws.mask(0))
+    is_r = np.equal(v, r, out=ws.mask(1))
+    is_r &= nz
+    np.subtract(g, b, out=mn)
+    np.divide(mn, c, out=h, where=is_r)
+    nz &= ~is_r
+    is_g = np.equal(v, g, out=ws.mask(1))
+    is_g &= nz
+    np.subtract(b, r, out=mn)
+    np.divide(mn, c, out=mn, where=is_g)
+    np.add(mn, 2.0, out=h, where=is_g)
+    nz &= ~is_g
+    np.subtract(r, g, out=mn)
+    np.divide(mn, c, out=mn, where=nz)
+    np.add(mn, 4.0, out=h, where=nz)
+    np.mod(h, 6.0, out=h)
+    h *= 255.0 / 6.0
+    return y
+
+
+def _hsv_inv(x: np.ndarray, ws: _Workspace) -> np.ndarray:
+    hq, sq, v = x
+    h6, f = ws.t(0), ws.t(1)
+    np.multiply(hq, 6.0 / 255.0, out=h6)
+    np.floor(h6, out=f)
+    np.subtract(h6, f, out=h6)  # h6 现为小数部分 f
+    sector = np.mod(f, 6.0, out=f).astype(np.intp)
+    sq /= 255.0
+    vals = np.empty((4, x.shape[1]), dtype=np.float32)
+    vals[0] = v
+    np.subtract(1.0, sq, out=vals[1])
+    vals[1] *= v
+    np.multiply(sq, h6, out=vals[2])
+    np.subtract(1.0, vals[2], out=vals[2])
+    vals[2] *= v
+    np.subtract(1.0, h6, out=vals[3])
+    vals[3] *= sq
+    np.subtract(1.0, vals[3], out=vals[3])
+    vals[3] *= v
+    x[...] = np.take_along_axis(vals, _HSV_SELECT[sector].T, axis=0)
+    return x
+
+
+# ========== Lab（D65） ==========
+_LEVELS = np.arange(256, dtype=np.float64) / 255.0
+_SRGB_LINEAR = np.where(_LEVELS <= 0.04045, _LEVELS / 12.92, ((_LEVELS + 0.055) / 1.055) ** 2.4).astype(np.float32)
+_WHITE = np.array([0.95047, 1.0, 1.08883])
+_RGB_XYZ = np.array(
+    [
+        [0.4124564, 0.3575761, 0.1804375],
+        [0.2126729, 0.7151522, 0.0721750],
+        [0.0193339, 0.1191920, 0.9503041],
+    ]
+)
+# 白点归一化并入矩阵
+_RGB_XYZN = (_RGB_XYZ / _WHITE[:, None]).astype(np.float32)
+_XYZN_RGB = np.linalg.inv(_RGB_XYZ / _WHITE[:, None]).astype(np.float32)
+_DELTA = 6.0 / 29.0
+
+
+def _lab_fwd(x: np.ndarray, ws: _Workspace) -> np.ndarray:
+    lin = ws.y
+    np.take(_SRGB_LINEAR, x.astype(np.uint8), out=lin)
+    f = np.matmul(_RGB_XYZN, lin, out=x)
+    # f(t) = t^(1/3)（t > δ³），否则 t / (3δ²) + 4/29
+    small = np.less_equal(f, _DELTA ** 3)
+    lin_part = f / (3 * _DELTA ** 2) + 4.0 / 29.0
+    np.cbrt(f, out=f)
+    np.copyto(f, lin_part, where=small)
+    fx, fy, fz = f
+    y = ws.y
+    np.multiply(fy, 116.0 * 255.0 / 100.0, out=y[0])
+    y[0] -= 16.0 * 255.0 / 100.0
+    np.subtract(fx, fy, out=y[1])
+    y[1] *= 500.0
+    y[1] += 128.0
+    np.subtract(fy, fz, out=y[2])
+    y[2] *= 200.0
+    y[2] += 128.0
+    return y
+
+
+def _lab_inv(x: np.ndarray, ws: _Workspace) -> np.ndarray:
+    lq, aq, bq = x
+    f = ws.y
+    np.multiply(lq, 100.0 / 255.0, out=f[1])
+    f[1] += 16.0
+    f[1] /= 116.0
+    np.subtract(aq, 128.0, out=f[0])
+    f[0] /= 500.0
+    f[0] += f[1]
+    np.subtract(bq, 128.0, out=f[2])
+    f[2] /= -200.0
+    f[2] += f[1]
+    # finv(f) = f³（f > δ），否则 3δ²(f - 4/29)
+    small = np.less_equal(f, _DELTA)
+    lin_part = (f - 4.0 / 29.0) * (3 * _DELTA ** 2)
+    np.power(f, 3, out=f)
+    np.copyto(f, lin_part, where=small)
+    lin = np.matmul(_XYZN_RGB, f, out=x)
+    np.clip(lin, 0.0, 1.0, out=lin)
+    low = np.less_equal(lin, 0.0031308)
+    low_part = lin * (12.92 * 255.0)
+    np.power(lin, 1.0 / 2.4, out=lin)
+    lin *= 1.055 * 255.0
+    lin -= 0.055 * 255.0
+    np.copyto(lin, low_part, where=low)
+    return lin
+
+
+# ========== 对外接口 ==========
+CONVERSIONS: Dict[str, Tuple[Kernel, Kernel]] = {
+    "ycrcb": (_ycrcb_fwd, _ycrcb_inv),
+    "hsi": (_hsi_fwd, _hsi_inv),
+    "hsv": (_hsv_fwd, _hsv_inv),
+    "lab": (_lab_fwd, _lab_inv),
+}
+
+
+def _kernels(space: str) -> Tuple[Kernel, Kernel]:
+    if space not in CONVERSIONS:
+        raise ValueError(f"未知颜色空间: {space}，可选 {sorted(CONVERSIONS)}")
+    return CONVERSIONS[space]
+
+
+def from_rgb(rgb: np.ndarray, space: str, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """RGB → space，返回 (..., 3) uint8；可写入预分配的 out。"""
+    return _run(_kernels(space)[0], rgb, out)
+
+
+def to_rgb(arr: np.ndarray, space: str, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """space → RGB，返回 (..., 3) uint8。"""
+    return _run(_kernels(space)[1], arr, out)
+
+
+def rgb_to_ycrcb(rgb: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+    return from_rgb(rgb, "ycrcb", out)
+
+
+def ycrcb_to_rgb(arr: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+    return to_rgb(arr, "ycrcb", out)
+
+
+def rgb_to_hsi(rgb: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+    return from_rgb(rgb, "hsi", out)
+
+
+def hsi_to_rgb(arr: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+    return to_rgb(arr, "hsi", out)
+
+
+def rgb_to_hsv(rgb: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+    return from_rgb(rgb, "hsv", out)
+
+
+def hsv_to_rgb(arr: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+    return to_rgb(arr, "hsv", out)
+
+
+def rgb_to_lab(rgb: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+    return from_rgb(rgb, "lab", out)
+
+
+def lab_to_rgb(arr: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+    return to_rgb(arr, "lab", out)
+
+
+def roundtrip_error(rgb: np.ndarray, space: str) -> Tuple[int, float]:
+    """RGB → space → RGB 的 (最大绝对误差, 平均绝对误差)。"""
+    back = to_rgb(from_rgb(rgb, space), space)
+    diff = np.abs(back.astype(np.int16) - rgb.astype(np.int16))
+    return int(diff.max()), float(diff.mean())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="颜色空间转换的往返误差与耗时")
+    parser.add_argument("image", nargs="?", type=Path, default=Path(__file__).resolve().parent / "jpg" / "素材" / "Lenna.jpg")
+    args = parser.parse_args()
+    from imgio import load_image
+
+    rgb = load_image(args.image, "RGB")
+    print(f"{args.image.name} {rgb.shape}")
+    for space in CONVERSIONS:
+        start = time.perf_counter()
+        conv = from_rgb(rgb, space)
+        fwd = time.perf_counter() - start
+        start = time.perf_counter()
+        to_rgb(conv, space)
+        inv = time.perf_counter() - start
+        max_err, mean_err = roundtrip_error(rgb, space)
+        print(f"{space:6s} 正变换 {fwd * 1e3:7.1f} ms  逆变换 {inv * 1e3:7.1f} ms  往返误差 max {max_err:3d} / mean {mean_err:.3f}")
+
+
+if __name__ == "__main__":
+    main()
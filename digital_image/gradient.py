@@ -0,0 +1,136 @@
+"""
+Sobel 梯度算子：一次 reflect 填充，按可分离形式 [1,2,1]ᵀ⊗[-1,0,1] / [1,0,-1]ᵀ⊗[1,2,1] 同时得到 gx、gy。
+- 填充缓冲直接以目标 dtype 分配（float32 或 int16），之后的加减全部写入预分配数组，
+  不再经过通用 convolve、不把梯度裁剪成 uint8 再转回浮点，负梯度得以保留。
+- 两个方向共用同一个填充缓冲和一个行方向中间缓冲：先算纵向平滑再横向差分得到 gx，
+  再复用中间缓冲算纵向差分、横向平滑得到 gy。
+- 与 convolution 一致采用相关（不翻转核）与 reflect 边界：gx 左负右正，gy 上正下负。
+整数输入时 int16 与 float32 的结果逐值相同（|g| ≤ 4·255）。
+所有切片都只作用于最后两维，(H,W,C) / (N,H,W[,C]) 输入按 planes.py 换轴后一次算完所有平面；
+填充后按 planes.strips 的行条带计算，中间缓冲只有条带大小，结果逐条带写入输入布局下的输出。
+sobel_sharpen 按每个平面各自的最大幅值归一化，与逐通道调用结果相同；
+sobel_sharpen_many 在多个 α 间共用梯度幅值，每个 α 只做缩放、叠加与裁剪（参数扫描见 sweep.py）。
+"""
+
+from __future__ import annotations
+
+from typing import Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from planes import as_planes, empty_output, pad_reflect, put_rows, restore, strips
+
+
+def _pad_reflect(gray: np.ndarray, dtype: np.dtype) -> np.ndarray:
+    """(…, H, W) 的单像素 reflect 填充，直接写入目标 dtype 的缓冲。"""
+    *lead, h, w = gray.shape
+    if h < 2 or w < 2:
+        return pad_reflect(gray, 1, 1).astype(dtype)
+    p = np.empty((*lead, h + 2, w + 2), dtype=dtype)
+    p[..., 1:-1, 1:-1] = gray
+    p[..., 0, 1:-1] = gray[..., 1, :]
+    p[..., -1, 1:-1] = gray[..., -2, :]
+    p[..., :, 0] = p[..., :, 2]
+    p[..., :, -1] = p[..., :, -3]
+    return p
+
+
+def _sobel_strip(p: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """由填充后的 (…, rows+2, W+2) 条带计算 (…, rows, W) 的 gx、gy。"""
+    dtype, lead = p.dtype, p.shape[:-2]
+    h, w = p.shape[-2] - 2, p.shape[-1] - 2
+    buf = np.empty((*lead, h, w + 2), dtype=dtype)
+    gx = np.empty((*lead, h, w), dtype=dtype)
+    gy = np.empty((*lead, h, w), dtype=dtype)
+
+    # gx：纵向 [1,2,1] 平滑，再横向 [-1,0,1] 差分
+    np.add(p[..., :-2, :], p[..., 2:, :], out=buf)
+    buf += p[..., 1:-1, :]
+    buf += p[..., 1:-1, :]
+    np.subtract(buf[..., 2:], buf[..., :-2], out=gx)
+
+    # gy：纵向 [1,0,-1] 差分，再横向 [1,2,1] 平滑
+    np.subtract(p[..., :-2, :], p[..., 2:, :], out=buf)
+    np.add(buf[..., :-2], buf[..., 2:], out=gy)
+    gy += buf[..., 1:-1]
+    gy += buf[..., 1:-1]
+    return gx, gy
+
+
+def sobel_gradients(gray: np.ndarray, dtype: np.dtype = np.float32) -> Tuple[np.ndarray, np.ndarray]:
+    """返回带符号的 (gx, gy)，dtype 为 float32 或 int16，布局与输入相同。"""
+    planes, channels_last = as_planes(gray)
+    p = _pad_reflect(planes, np.dtype(dtype))
+    gx = empty_output(planes.shape, p.dtype, channels_last)
+    gy = empty_output(planes.shape, p.dtype, channels_last)
+    for y0, y1 in strips(planes.shape[-2], p[..., 0, :].size):
+        sx, sy = _sobel_strip(p[..., y0:y1 + 2, :])
+        put_rows(gx, y0, sx, channels_last)
+        put_rows(gy, y0, sy, channels_last)
+    return gx, gy
+
+
+def _magnitude_planes(planes: np.ndarray) -> np.ndarray:
+    """(…, H, W) 的 float32 梯度幅值，逐条带计算。"""
+    p = _pad_reflect(planes, np.float32)
+    mag = np.empty(planes.shape, dtype=np.float32)
+    for y0, y1 in strips(planes.shape[-2], p[..., 0, :].size):
+        sx, sy = _sobel_strip(p[..., y0:y1 + 2, :])
+        magnitude(sx, sy, out=mag[..., y0:y1, :])
+    return mag
+
+
+def magnitude(gx: np.ndarray, gy: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """float32 梯度幅值 √(gx² + gy²)，float32 输入时可令 out=gx 原地计算。
+    Sobel 梯度的平方和不超过 2·1020²，在 float32 中精确，开方结果与 np.hypot 逐位相同但快约一倍。"""
+    sq = np.square(gy, dtype=np.float32)
+    out = np.square(gx, out=out, dtype=np.float32)
+    out += sq
+    return np.sqrt(out, out=out)
+
+
+def orientation(gx: np.ndarray, gy: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """梯度方向 atan2(gy, gx)，弧度，范围 (-π, π]。"""
+    return np.arctan2(gy, gx, out=out)
+
+
+def sobel_magnitude(gray: np.ndarray) -> np.ndarray:
+    """float32 梯度幅值。"""
+    planes, channels_last = as_planes(gray)
+    return restore(_magnitude_planes(planes), channels_last)
+
+
+def apply_sharpen(
+    gray: np.ndarray, mag: np.ndarray, alpha: float, mag_max: Union[float, np.ndarray]
+) -> np.ndarray:
+    """gray + alpha · mag / mag_max · 255，裁剪到 uint8。mag 为 float32，会被原地改写；
+    mag_max 可以是标量，也可以是能与 mag 广播的逐平面最大值。"""
+    mag *= np.float32(alpha * 255.0) / (np.asarray(mag_max, dtype=np.float32) + np.float32(1e-6))
+    mag += gray
+    np.clip(mag, 0, 255, out=mag)
+    return mag.astype(np.uint8)
+
+
+def sobel_sharpen(gray: np.ndarray, alpha: float) -> np.ndarray:
+    """Sobel 幅值锐化：幅值按（每个平面的）最大值归一化到 0-255 后按系数 alpha 叠加到原图。"""
+    planes, channels_last = as_planes(gray)
+    mag = _magnitude_planes(planes)
+    mag_max = mag.max(axis=(-2, -1), keepdims=True) if mag.ndim > 2 else float(mag.max())
+    out = empty_output(planes.shape, np.uint8, channels_last)
+    for y0, y1 in strips(planes.shape[-2], mag[..., 0, :].size):
+        put_rows(out, y0, apply_sharpen(planes[..., y0:y1, :], mag[..., y0:y1, :], alpha, mag_max), channels_last)
+    return out
+
+
+def sobel_sharpen_many(gray: np.ndarray, alphas: Sequence[float]) -> np.ndarray:
+    """多个 α 的 Sobel 锐化，返回 (N, …) 结果栈，与逐个调用 sobel_sharpen 逐位相同。
+    梯度幅值与最大值只算一次；按条带处理，同一条带的幅值在缓存内被各个 α 复用。"""
+    planes, channels_last = as_planes(gray)
+    mag = _magnitude_planes(planes)
+    mag_max = mag.max(axis=(-2, -1), keepdims=True) if mag.ndim > 2 else float(mag.max())
+    out = np.empty((len(alphas),) + gray.shape, dtype=np.uint8)
+    for y0, y1 in strips(planes.shape[-2], mag[..., 0, :].size):
+        rows = mag[..., y0:y1, :]
+        for i, alpha in enumerate(alphas):
+            put_rows(out[i], y0, apply_sharpen(planes[..., y0:y1, :], rows.copy(), alpha, mag_max), channels_last)
+    return out
@@ -0,0 +1,185 @@
+"""
+灰度直方图子系统：np.bincount 统计一次，统计量与绘图共用同一份计数。
+- hist_stats：由 256 桶计数得到均值、标准差、中位数、熵等，不再遍历像素；stats_html 把结果排成小表格嵌入报告。
+- render_hist：直接在 NumPy 画布上栅格化柱状图（一次广播比较生成全部柱子），
+  坐标轴刻度与标题用 PIL ImageDraw 绘制，再以低压缩级别编码 PNG。
+- hist_svg：输出内联 SVG 字符串（所有柱子合并为一条 path），可直接嵌入 HTML。
+相比 matplotlib 的 ax.hist（逐像素重新分桶 + 建图 + 保存），单张直方图耗时为毫秒级。
+"""
+
+from __future__ import annotations
+
+import html
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Tuple
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from lut import histogram
+
+
+# 与原 matplotlib 版本 figsize=(4, 3), dpi=150 相同的输出尺寸
+CANVAS_SIZE = (600, 450)
+MARGIN = (64, 36, 16, 48)  # 左、上、右、下
+BAR_COLOR = (70, 130, 180)
+GRID_COLOR = (221, 221, 221)
+CJK_FONT_CANDIDATES = (
+    "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/truetype/wqy/wqy-microhei.ttc",
+    "/System/Library/Fonts/PingFang.ttc",
+    "C:/Windows/Fonts/msyh.ttc",
+)
+
+
+# ========== 统计 ==========
+@dataclass
+class HistStats:
+    count: int
+    mean: float
+    std: float
+    min: int
+    max: int
+    median: int
+    entropy: float
+
+
+def hist_stats(counts: np.ndarray) -> HistStats:
+    """由 256 桶计数计算统计量。"""
+    counts = np.asarray(counts, dtype=np.float64)
+    total = counts.sum()
+    levels = np.arange(counts.size)
+    mean = float((counts * levels).sum() / total)
+    var = float((counts * (levels - mean) ** 2).sum() / total)
+    nonzero = np.nonzero(counts)[0]
+    cdf = counts.cumsum()
+    p = counts[nonzero] / total
+    return HistStats(
+        count=int(total),
+        mean=mean,
+        std=var ** 0.5,
+        min=int(nonzero[0]),
+        max=int(nonzero[-1]),
+        median=int(np.searchsorted(cdf, total / 2)),
+        entropy=float(-(p * np.log2(p)).sum()),
+    )
+
+
+def stats_html(stats: HistStats) -> str:
+    """统计量的内联 HTML 表格（沿用报告的 data 表格样式）。"""
+    rows = [
+        ("像素数", f"{stats.count}"),
+        ("均值", f"{stats.mean:.2f}"),
+        ("标准差", f"{stats.std:.2f}"),
+        ("中位数", f"{stats.median}"),
+        ("范围", f"{stats.min}–{stats.max}"),
+        ("熵 (bit)", f"{stats.entropy:.3f}"),
+    ]
+    body = "".join(f"<tr><th>{html.escape(k)}</th><td>{html.escape(v)}</td></tr>" for k, v in rows)
+    return f"<table class='data'>{body}</table>"
+
+
+# ========== 栅格渲染 ==========
+def _font(size: int) -> ImageFont.ImageFont:
+    for path in CJK_FONT_CANDIDATES:
+        if Path(path).exists():
+            return ImageFont.truetype(path, size)
+    return ImageFont.load_default(size)
+
+
+def _nice_step(max_value: float, ticks: int = 4) -> float:
+    raw = max_value / ticks
+    magnitude = 10 ** np.floor(np.log10(raw)) if raw > 0 else 1
+    for m in (1, 2, 5, 10):
+        if raw <= m * magnitude:
+            return float(m * magnitude)
+    return float(10 * magnitude)
+
+
+def render_hist(
+    counts: np.ndarray,
+    title: Optional[str] = None,
+    size: Tuple[int, int] = CANVAS_SIZE,
+    color: Tuple[int, int, int] = BAR_COLOR,
+) -> np.ndarray:
+    """把 256 桶计数画成 (H, W, 3) uint8 柱状图。"""
+    width, height = size
+    left, top, right, bottom = MARGIN
+    plot_w, plot_h = width - left - right, height - top - bottom
+    canvas = np.full((height, width, 3), 255, dtype=np.uint8)
+    plot = canvas[top:top + plot_h, left:left + plot_w]
+
+    peak = float(np.max(counts)) or 1.0
+    step = _nice_step(peak)
+    y_max = step * np.ceil(peak / step)
+
+    # 网格线（虚线）：每隔 step 一条
+    for value in np.arange(step, y_max + step / 2, step):
+        row = plot_h - 1 - int(round(value / y_max * (plot_h - 1)))
+        for offset in range(3):
+            plot[row, offset::6] = GRID_COLOR
+
+    # 柱子：每个画布列对应一个灰度桶，一次广播比较得到全部填充像素
+    col_bins = (np.arange(plot_w) * 256) // plot_w
+    bar_px = np.round(np.asarray(counts, dtype=np.float64)[col_bins] / y_max * plot_h).astype(np.int64)
+    rows = np.arange(plot_h)[:, None]
+    plot[rows >= plot_h - bar_px[None, :]] = color
+
+    # 坐标轴
+    canvas[top:top + plot_h + 1, left - 1] = 0
+    canvas[top + plot_h, left - 1:left + plot_w] = 0
+
+    img = Image.fromarray(canvas)
+    draw = ImageDraw.Draw(img)
+    small = _font(12)
+    for level in range(0, 256, 50):
+        x = left + int(level * plot_w / 256)
+        draw.line([(x, top + plot_h), (x, top + plot_h + 4)], fill=(0, 0, 0))
+        draw.text((x, top + plot_h + 6), str(level), fill=(0, 0, 0), font=small, anchor="mt")
+    for value in np.arange(0, y_max + step / 2, step):
+        y = top + plot_h - int(round(value / y_max * plot_h))
+        draw.line([(left - 5, y), (left - 1, y)], fill=(0, 0, 0))
+        draw.text((left - 7, y), f"{int(value)}", fill=(0, 0, 0), font=small, anchor="rm")
+    draw.text((left + plot_w // 2, height - 6), "Gray Level", fill=(0, 0, 0), font=small, anchor="mb")
+    draw.text((4, 4), "Pixel Count", fill=(0, 0, 0), font=small, anchor="lt")
+    if title:
+        draw.text((left + plot_w // 2, top // 2), title, fill=(0, 0, 0), font=_font(16), anchor="mm")
+    return np.asarray(img)
+
+
+def save_hist_png(counts: np.ndarray, dst: Path, title: Optional[str] = None, compress_level: int = 1) -> Path:
+    """渲染并保存直方图 PNG；柱状图色块多，低压缩级别已足够小。"""
+    Image.fromarray(render_hist(counts, title)).save(dst, format="PNG", compress_level=compress_level)
+    return dst
+
+
+def plot_hist(arr: np.ndarray, title: str, dst: Path) -> Tuple[Path, np.ndarray]:
+    """统计 uint8 图像直方图并保存 PNG，返回 (路径, 计数) 以便复用计数。"""
+    counts = histogram(arr)
+    return save_hist_png(counts, dst, title), counts
+
+
+# ========== SVG ==========
+def hist_svg(counts: np.ndarray, title: Optional[str] = None, width: int = 320, height: int = 200) -> str:
+    """内联 SVG 柱状图，所有柱子合并为一条 path。"""
+    counts = np.asarray(counts, dtype=np.float64)
+    pad_top = 20 if title else 4
+    plot_h = height - pad_top - 4
+    bar_w = width / counts.size
+    peak = counts.max() or 1.0
+    heights = counts / peak * plot_h
+    base = pad_top + plot_h
+    segments = [
+        f"M{i * bar_w:.2f} {base}v{-h:.1f}h{bar_w:.2f}v{h:.1f}z" for i, h in enumerate(heights) if h > 0
+    ]
+    title_el = (
+        f'<text x="{width / 2}" y="14" text-anchor="middle" font-size="12">{html.escape(title)}</text>' if title else ""
+    )
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" viewBox="0 0 {width} {height}">'
+        f"{title_el}"
+        f'<path d="{"".join(segments)}" fill="rgb{BAR_COLOR}"/>'
+        f'<line x1="0" y1="{base}" x2="{width}" y2="{base}" stroke="#000"/>'
+        "</svg>"
+    )
@@ -0,0 +1,138 @@
+"""
+阶段插桩：记录每个阶段的墙钟时间、CPU 时间、tracemalloc 峰值与写出字节数。
+- Profiler.stage(name, kind) 是上下文管理器，返回的 StageRecord 可用 wrote(path) 累加写出的文件大小；
+  Profiler.timed(kind) 是同样功能的装饰器。kind 为类别（decode / compute / encode / report ……），
+  用于汇总。
+- CPU 时间取 time.process_time()，是整个进程的 CPU 时间（含 NumPy / PIL 的其他线程），
+  可能大于墙钟时间。
+- trace_memory=True 时启动 tracemalloc（NumPy 数组分配会登记到 tracemalloc），记录阶段内相对
+  进入时的新增峰值。阶段可以嵌套：进入子阶段前先把当前峰值并入父阶段再 reset_peak，父子的峰值都正确。
+  tracemalloc 会拖慢大量小对象分配的纯 Python 代码，默认关闭。
+- rows() / summary_rows() 给出明细与按类别汇总的表格行，dump(path) 写 JSON。
+"""
+
+from __future__ import annotations
+
+import functools
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Union
+
+
+@dataclass
+class StageRecord:
+    name: str
+    kind: str
+    wall_s: float = 0.0
+    cpu_s: float = 0.0
+    peak_bytes: Optional[int] = None
+    bytes_written: int = 0
+
+    def wrote(self, path: Union[str, Path]) -> None:
+        """累加一个已写出文件的大小。"""
+        try:
+            self.bytes_written += Path(path).stat().st_size
+        except OSError:
+            pass
+
+
+class Profiler:
+    """收集 StageRecord；一个 Build 或一次脚本运行用一个实例。"""
+
+    HEADER = ["阶段", "类别", "墙钟 (ms)", "CPU (ms)", "峰值内存 (MB)", "写出 (KB)"]
+
+    def __init__(self, trace_memory: bool = False) -> None:
+        self.trace_memory = trace_memory
+        self.records: List[StageRecord] = []
+        # 嵌套阶段的 [进入时的已分配字节, 已观察到的峰值]
+        self._stack: List[List[int]] = []
+        self._started_tracing = False
+
+    # ---------- 内存 ----------
+    def _push(self) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        current, peak = tracemalloc.get_traced_memory()
+        if self._stack:
+            self._stack[-1][1] = max(self._stack[-1][1], peak)
+        tracemalloc.reset_peak()
+        self._stack.append([current, current])
+
+    def _pop(self) -> int:
+        base, seen = self._stack.pop()
+        peak = max(seen, tracemalloc.get_traced_memory()[1])
+        if self._stack:
+            self._stack[-1][1] = max(self._stack[-1][1], peak)
+        elif self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        return max(peak - base, 0)
+
+    # ---------- 记录 ----------
+    @contextmanager
+    def stage(self, name: str, kind: str = "compute") -> Iterator[StageRecord]:
+        record = StageRecord(name, kind)
+        if self.trace_memory:
+            self._push()
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield record
+        finally:
+            record.wall_s = time.perf_counter() - wall
+            record.cpu_s = time.process_time() - cpu
+            if self.trace_memory:
+                record.peak_bytes = self._pop()
+            self.records.append(record)
+
+    def timed(self, kind: str = "compute", name: Optional[str] = None) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+        """装饰器：每次调用记为一个阶段，名称默认为函数名。"""
+
+        def decorate(fn: Callable[..., Any]) -> Callable[..., Any]:
+            @functools.wraps(fn)
+            def wrapper(*args: Any, **kwargs: Any) -> Any:
+                with self.stage(name or fn.__qualname__, kind):
+                    return fn(*args, **kwargs)
+
+            return wrapper
+
+        return decorate
+
+    # ---------- 汇总 ----------
+    def totals(self) -> Dict[str, StageRecord]:
+        """按类别累加（峰值取最大）。"""
+        out: Dict[str, StageRecord] = {}
+        for r in self.records:
+            t = out.setdefault(r.kind, StageRecord(r.kind, r.kind))
+            t.wall_s += r.wall_s
+            t.cpu_s += r.cpu_s
+            t.bytes_written += r.bytes_written
+            if r.peak_bytes is not None:
+                t.peak_bytes = max(t.peak_bytes or 0, r.peak_bytes)
+        return out
+
+    @staticmethod
+    def _row(label: str, r: StageRecord) -> List[str]:
+        peak = "-" if r.peak_bytes is None else f"{r.peak_bytes / 2 ** 20:.1f}"
+        written = f"{r.bytes_written / 1024:.1f}" if r.bytes_written else "-"
+        return [label, r.kind, f"{r.wall_s * 1e3:.1f}", f"{r.cpu_s * 1e3:.1f}", peak, written]
+
+    def summary_rows(self) -> List[List[str]]:
+        return [self._row(f"合计 · {kind}", t) for kind, t in self.totals().items()]
+
+    def rows(self) -> List[List[str]]:
+        return [self._row(r.name, r) for r in self.records]
+
+    def dump(self, path: Path, **extra: Any) -> Path:
+        data = {
+            **extra,
+            "trace_memory": self.trace_memory,
+            "totals": {kind: asdict(t) for kind, t in self.totals().items()},
+            "stages": [asdict(r) for r in self.records],
+        }
+        path.write_text(json.dumps(data, ensure_ascii=False, indent=1), encoding="utf-8")
+        return path
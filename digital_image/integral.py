@@ -0,0 +1,158 @@
+"""
+积分图（summed-area table）与基于它的局部统计：
+- SummedAreaTable：对 reflect 填充后的图像建一次积分图，可反复查询任意奇数窗口的
+  和 / 平方和 / 均值 / 方差，每像素 4 次查表，代价与窗口大小无关。
+- box_sum / box_filter / local_variance：一次性调用的便捷函数。
+- mean_filter：与实验三原均值滤波等价，但用整数窗口和代替 k×k 卷积核；
+  mean_filter_many 对多个 k 只按最大窗口建一次积分图（参数扫描见 sweep.py）。
+uint8 输入使用无符号整型积分图，按模 2^n 运算：积分图本身可以溢出回绕，
+只要单个窗口的真实和小于 2^n，四角相减的结果就是精确值。
+积分图与查询都只作用于最后两维：SummedAreaTable 接受 (…, H, W) 平面栈，
+便捷函数另外接受 (H,W,C) / (N,H,W,C)，按 planes.py 的约定换轴后一次处理所有通道。
+"""
+
+from __future__ import annotations
+
+from typing import List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from convolution import convolve
+from planes import as_planes, pad_reflect, restore
+
+
+KSize = Union[int, Tuple[int, int]]
+
+
+# ========== 工具函数 ==========
+def _ksize2(ksize: KSize) -> Tuple[int, int]:
+    kh, kw = (ksize, ksize) if isinstance(ksize, int) else ksize
+    if kh % 2 == 0 or kw % 2 == 0 or kh < 1 or kw < 1:
+        raise ValueError(f"窗口尺寸需为正奇数: {ksize}")
+    return kh, kw
+
+
+def _table_dtype(arr: np.ndarray, max_value: int, max_area: int) -> type:
+    """无符号输入按窗口和上限选择最窄的无符号类型；有符号整型用 int64，浮点用 float64。"""
+    if np.issubdtype(arr.dtype, np.signedinteger):
+        return np.int64
+    if not np.issubdtype(arr.dtype, np.integer):
+        return np.float64
+    return np.uint32 if max_value * max_area < 2 ** 32 else np.uint64
+
+
+def integral_image(arr: np.ndarray, dtype: Optional[type] = None) -> np.ndarray:
+    """返回 (…, H+1, W+1) 积分图，首行首列为 0：T[…, y, x] = arr[…, :y, :x].sum()。"""
+    dtype = dtype or (np.uint64 if np.issubdtype(arr.dtype, np.integer) else np.float64)
+    table = np.zeros(arr.shape[:-2] + (arr.shape[-2] + 1, arr.shape[-1] + 1), dtype=dtype)
+    np.cumsum(arr, axis=-2, dtype=dtype, out=table[..., 1:, 1:])
+    np.cumsum(table[..., 1:, 1:], axis=-1, dtype=dtype, out=table[..., 1:, 1:])
+    return table
+
+
+# ========== 积分图对象 ==========
+class SummedAreaTable:
+    """对 reflect 填充 max_ksize//2 后的图像建积分图，查询不超过 max_ksize 的任意奇数窗口。
+    arr 为 (…, H, W)，前面的维度逐平面独立建表。"""
+
+    def __init__(self, arr: np.ndarray, max_ksize: KSize) -> None:
+        if arr.ndim < 2:
+            raise ValueError("SummedAreaTable 需要 (…, H, W) 数组")
+        kh, kw = _ksize2(max_ksize)
+        self.shape = arr.shape[-2:]
+        self.pad = (kh // 2, kw // 2)
+        self.max_ksize = (kh, kw)
+        self._padded = pad_reflect(arr, *self.pad)
+        max_value = int(np.iinfo(arr.dtype).max) if np.issubdtype(arr.dtype, np.integer) else 0
+        self._area = kh * kw
+        self._max_value = max_value
+        self.table = integral_image(self._padded, _table_dtype(arr, max_value, self._area))
+        self._sq_table: Optional[np.ndarray] = None
+
+    def _query(self, table: np.ndarray, ksize: KSize) -> np.ndarray:
+        kh, kw = _ksize2(ksize)
+        if kh > self.max_ksize[0] or kw > self.max_ksize[1]:
+            raise ValueError(f"窗口 {ksize} 超过建表时的 max_ksize {self.max_ksize}")
+        h, w = self.shape
+        y0, x0 = self.pad[0] - kh // 2, self.pad[1] - kw // 2
+        y1, x1 = y0 + kh, x0 + kw
+        out = table[..., y1:y1 + h, x1:x1 + w] - table[..., y0:y0 + h, x1:x1 + w]
+        out -= table[..., y1:y1 + h, x0:x0 + w]
+        out += table[..., y0:y0 + h, x0:x0 + w]
+        return out
+
+    @property
+    def sq_table(self) -> np.ndarray:
+        """平方值的积分图，首次用到方差时再构建。"""
+        if self._sq_table is None:
+            sq_dtype = _table_dtype(self._padded, self._max_value ** 2, self._area)
+            self._sq_table = integral_image(self._padded.astype(sq_dtype) ** 2, sq_dtype)
+        return self._sq_table
+
+    def window_sum(self, ksize: KSize) -> np.ndarray:
+        return self._query(self.table, ksize)
+
+    def window_sq_sum(self, ksize: KSize) -> np.ndarray:
+        return self._query(self.sq_table, ksize)
+
+    def mean(self, ksize: KSize) -> np.ndarray:
+        kh, kw = _ksize2(ksize)
+        return (self.window_sum(ksize) / (kh * kw)).astype(np.float32)
+
+    def variance(self, ksize: KSize) -> np.ndarray:
+        """局部方差 E[x²] - E[x]²（总体方差），float32。"""
+        kh, kw = _ksize2(ksize)
+        n = kh * kw
+        s = self.window_sum(ksize).astype(np.float64)
+        sq = self.window_sq_sum(ksize).astype(np.float64)
+        var = (sq - s * s / n) / n
+        return np.maximum(var, 0).astype(np.float32)
+
+
+# ========== 便捷函数 ==========
+def box_sum(arr: np.ndarray, ksize: KSize) -> np.ndarray:
+    """reflect 边界的窗口和；整数输入结果为精确整数。"""
+    planes, channels_last = as_planes(arr)
+    return restore(SummedAreaTable(planes, ksize).window_sum(ksize), channels_last)
+
+
+def box_filter(arr: np.ndarray, ksize: KSize) -> np.ndarray:
+    """reflect 边界的窗口均值（float32，未裁剪）。"""
+    planes, channels_last = as_planes(arr)
+    return restore(SummedAreaTable(planes, ksize).mean(ksize), channels_last)
+
+
+def local_variance(arr: np.ndarray, ksize: KSize) -> np.ndarray:
+    planes, channels_last = as_planes(arr)
+    return restore(SummedAreaTable(planes, ksize).variance(ksize), channels_last)
+
+
+def mean_filter(gray: np.ndarray, ksize: int) -> np.ndarray:
+    """均值滤波：uint8 输入用整数窗口和整除 k²，结果为精确的向下取整均值。"""
+    if ksize % 2 == 0:
+        return convolve(gray, np.ones((ksize, ksize), dtype=np.float32) / (ksize * ksize))
+    planes, channels_last = as_planes(gray)
+    sums = SummedAreaTable(planes, ksize).window_sum(ksize)
+    if np.issubdtype(sums.dtype, np.integer):
+        return restore((sums // (ksize * ksize)).astype(np.uint8), channels_last)
+    return restore(np.clip(sums / (ksize * ksize), 0, 255).astype(np.uint8), channels_last)
+
+
+def mean_filter_many(gray: np.ndarray, ksizes: Sequence[int]) -> np.ndarray:
+    """多个 k 的均值滤波，返回 (N, …) 结果栈，与逐个调用 mean_filter 逐位相同。
+    整数输入的窗口和是精确值，与建表时的填充量无关，因此按最大窗口建一次积分图即可；
+    浮点输入逐个调用 mean_filter。偶数 k 的输出比输入大一圈，无法放进同一个结果栈。"""
+    even: List[int] = [k for k in ksizes if k % 2 == 0]
+    if even:
+        raise ValueError(f"mean_filter_many 只支持奇数窗口，收到 {even}")
+    table: Optional[SummedAreaTable] = None
+    planes, channels_last = as_planes(gray)
+    if ksizes and np.issubdtype(gray.dtype, np.integer):
+        table = SummedAreaTable(planes, max(ksizes))
+    out = np.empty((len(ksizes),) + gray.shape, dtype=np.uint8)
+    for i, k in enumerate(ksizes):
+        if table is None:
+            out[i] = mean_filter(gray, k)
+        else:
+            out[i] = restore((table.window_sum(k) // (k * k)).astype(np.uint8), channels_last)
+    return out
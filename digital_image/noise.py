@@ -0,0 +1,165 @@
+"""
+噪声生成：基于 np.random.Generator，结果只由种子决定，与进程数、调度顺序无关。
+- stream(seed, *key)：由根种子与整数键（图像序号、块序号……）派生独立随机流，
+  等价于 SeedSequence(seed).spawn() 的对应子序列；批处理按图像序号取流，
+  分块并行时按 (图像序号, 块序号) 取流，换多少个进程结果都逐位相同。
+- 噪声以 float32 分块生成：每块写入同一个预分配工作区（Generator 的 out= / dtype=float32），
+  与原图相加、舍入、裁剪后直接写入 uint8 输出，不生成整图规模的 float64 临时数组。
+  同一随机流分块生成与一次生成的序列相同，块大小不影响结果。
+- 模型：高斯（加性）、泊松（光子计数，peak 为灰度 255 对应的平均光子数）、
+  散斑（乘性，g·(1 + n)）、椒盐。out 可以是输入本身，实现原地加噪。
+- 各 add_* 的 key 转发给 stream(seed, key)：同一根种子下的不同加噪阶段取不同的 key，
+  各自使用独立的随机流，否则它们会抽到同一串随机数（同一个 N(0,1) 场、同一组椒盐位置）。
+"""
+
+from __future__ import annotations
+
+from typing import Callable, List, Optional, Tuple, Union
+
+import numpy as np
+
+
+CHUNK_PIXELS = 1 << 16
+
+Seed = Union[None, int, np.random.SeedSequence, np.random.Generator]
+# 把一块输入像素（float32）原地变为加噪后的值；第三个参数为同尺寸的 float32 工作区
+Model = Callable[[np.random.Generator, np.ndarray, np.ndarray], None]
+
+
+# ========== 随机流 ==========
+def stream(seed: Seed, *key: int) -> np.random.Generator:
+    """派生独立随机流。seed 为 Generator 且不带键时原样返回（便于在调用链中传递同一个流）。"""
+    if isinstance(seed, np.random.Generator):
+        if not key:
+            return seed
+        root = seed.bit_generator.seed_seq
+    elif isinstance(seed, np.random.SeedSequence):
+        root = seed
+    else:
+        root = np.random.SeedSequence(seed)
+    if key:
+        root = np.random.SeedSequence(root.entropy, spawn_key=tuple(root.spawn_key) + key, pool_size=root.pool_size)
+    return np.random.Generator(np.random.PCG64(root))
+
+
+def spawn(seed: Seed, n: int) -> List[np.random.Generator]:
+    """n 个独立随机流，第 i 个与 stream(seed, i) 相同。"""
+    return [stream(seed, i) for i in range(n)]
+
+
+def fill_normal(out: np.ndarray, seed: Seed = None, mean: float = 0.0, std: float = 1.0) -> np.ndarray:
+    """在预分配的 float32 缓冲中原地生成 N(mean, std²) 噪声。"""
+    if out.dtype != np.float32:
+        raise TypeError(f"fill_normal 需要 float32 缓冲，收到 {out.dtype}")
+    stream(seed).standard_normal(out=out, dtype=np.float32)
+    if std != 1.0:
+        out *= np.float32(std)
+    if mean != 0.0:
+        out += np.float32(mean)
+    return out
+
+
+# ========== 分块执行 ==========
+def _keys(key: Optional[int]) -> Tuple[int, ...]:
+    return () if key is None else (key,)
+
+
+def _run(
+    model: Model, src: np.ndarray, seed: Seed, out: Optional[np.ndarray], key: Optional[int] = None
+) -> np.ndarray:
+    """逐块：uint8 → float32 工作区 → model → 四舍五入、裁剪 → uint8 输出。"""
+    if src.dtype != np.uint8:
+        raise TypeError(f"加噪需要 uint8 图像，收到 {src.dtype}")
+    if out is None:
+        out = np.empty(src.shape, dtype=np.uint8)
+    elif out.shape != src.shape or out.dtype != np.uint8 or not out.flags.c_contiguous:
+        raise ValueError("out 必须是与输入同形状、C 连续的 uint8 数组")
+    rng = stream(seed, *_keys(key))
+    src_px = np.ascontiguousarray(src).reshape(-1)
+    out_px = out.reshape(-1)
+    n = src_px.size
+    size = min(CHUNK_PIXELS, max(n, 1))
+    x = np.empty(size, dtype=np.float32)
+    t = np.empty(size, dtype=np.float32)
+    for start in range(0, n, CHUNK_PIXELS):
+        stop = min(n, start + CHUNK_PIXELS)
+        xc, tc = x[: stop - start], t[: stop - start]
+        xc[...] = src_px[start:stop]
+        model(rng, xc, tc)
+        np.rint(xc, out=xc)
+        np.clip(xc, 0, 255, out=xc)
+        out_px[start:stop] = xc
+    return out
+
+
+# ========== 噪声模型 ==========
+def add_gaussian_noise(
+    gray: np.ndarray,
+    mean: float = 0.0,
+    std: float = 15.0,
+    seed: Seed = None,
+    out: Optional[np.ndarray] = None,
+    key: Optional[int] = None,
+) -> np.ndarray:
+    """加性高斯噪声 g + N(mean, std²)。"""
+
+    def model(rng: np.random.Generator, x: np.ndarray, t: np.ndarray) -> None:
+        rng.standard_normal(out=t, dtype=np.float32)
+        t *= np.float32(std)
+        t += np.float32(mean)
+        x += t
+
+    return _run(model, gray, seed, out, key)
+
+
+def add_speckle_noise(
+    gray: np.ndarray, std: float = 0.2, seed: Seed = None, out: Optional[np.ndarray] = None, key: Optional[int] = None
+) -> np.ndarray:
+    """乘性散斑噪声 g·(1 + n)，n ~ N(0, std²)。"""
+
+    def model(rng: np.random.Generator, x: np.ndarray, t: np.ndarray) -> None:
+        rng.standard_normal(out=t, dtype=np.float32)
+        t *= np.float32(std)
+        t *= x
+        x += t
+
+    return _run(model, gray, seed, out, key)
+
+
+def add_poisson_noise(
+    gray: np.ndarray, peak: float = 30.0, seed: Seed = None, out: Optional[np.ndarray] = None, key: Optional[int] = None
+) -> np.ndarray:
+    """泊松（散粒）噪声：灰度按 peak/255 换算为平均光子数，采样计数后换算回灰度。
+    peak 越小噪声越强；Generator.poisson 只有 float64 入参与 int64 输出，块内临时量大小固定。"""
+    gain = peak / 255.0
+
+    def model(rng: np.random.Generator, x: np.ndarray, t: np.ndarray) -> None:
+        t[...] = rng.poisson(x * gain)
+        np.multiply(t, np.float32(1.0 / gain), out=x)
+
+    return _run(model, gray, seed, out, key)
+
+
+def add_salt_pepper(
+    img: np.ndarray,
+    amount: float = 0.02,
+    salt_vs_pepper: float = 0.5,
+    seed: Seed = None,
+    out: Optional[np.ndarray] = None,
+    key: Optional[int] = None,
+) -> np.ndarray:
+    """椒盐噪声：随机抽取 amount·像素数 个位置（可重复），按比例置为 255 / 0。
+    只生成位置索引，out=img 时原地修改。"""
+    if out is None:
+        out = img.copy()
+    elif out.shape != img.shape or not out.flags.c_contiguous:
+        raise ValueError("out 必须是与输入同形状、C 连续的数组")
+    elif out is not img:
+        out[...] = img
+    num = int(amount * img.size)
+    num_salt = int(num * salt_vs_pepper)
+    idx = stream(seed, *_keys(key)).integers(0, img.size, num)
+    flat = out.reshape(-1)
+    flat[idx[:num_salt]] = 255
+    flat[idx[num_salt:]] = 0
+    return out
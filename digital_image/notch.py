@@ -0,0 +1,139 @@
+"""
+频域陷波：一次找出 top-k 个偏离中心的峰值，只在峰值及其共轭点附近的有界窗口内写掩膜。
+- find_peaks：3×3 局部极大（可分离、周期边界）得到候选点，argpartition 取最大的若干候选，
+  再按幅值从大到小做贪心非极大值抑制（与已选峰值及其共轭点距离 ≤ min_distance 的候选被抑制），
+  每选中一个峰值只对候选集做一次 O(候选数) 的距离判断。
+  不再对整幅谱反复 argmax，也不生成整幅的距离数组。
+- notch_mask：每个陷波只计算 (2R+1)² 的窗口，窗口按周期回绕；各陷波相乘合成掩膜。
+  支持 ideal（圆盘置零）、butterworth、gaussian 三种剖面，平滑剖面的窗口截断在 1 - H < NOTCH_EPS 处。
+坐标均为 fftshift 后（中心化）完整谱上的 (行, 列)。
+"""
+
+from __future__ import annotations
+
+from typing import Tuple
+
+import numpy as np
+
+
+PROFILES = ("ideal", "butterworth", "gaussian")
+NOTCH_EPS = 1e-3
+
+
+# ========== 峰值检测 ==========
+def mirror_points(points: np.ndarray, shape: Tuple[int, int]) -> np.ndarray:
+    """中心化谱上各点的共轭对称点（零频在 (h//2, w//2)）。"""
+    h, w = shape
+    return np.stack([(2 * (h // 2) - points[:, 0]) % h, (2 * (w // 2) - points[:, 1]) % w], axis=1)
+
+
+def _local_max(mag: np.ndarray) -> np.ndarray:
+    """3×3 邻域最大值，周期边界（频谱本身是周期的）；先行后列，切片原地比较，不做 np.roll 拷贝。"""
+    rows = mag.copy()
+    np.maximum(rows[:, 1:], mag[:, :-1], out=rows[:, 1:])
+    np.maximum(rows[:, 0], mag[:, -1], out=rows[:, 0])
+    np.maximum(rows[:, :-1], mag[:, 1:], out=rows[:, :-1])
+    np.maximum(rows[:, -1], mag[:, 0], out=rows[:, -1])
+    out = rows.copy()
+    np.maximum(out[1:], rows[:-1], out=out[1:])
+    np.maximum(out[0], rows[-1], out=out[0])
+    np.maximum(out[:-1], rows[1:], out=out[:-1])
+    np.maximum(out[-1], rows[0], out=out[-1])
+    return out
+
+
+def _periodic_dist2(a: np.ndarray, b: np.ndarray, shape: Tuple[int, int]) -> np.ndarray:
+    """a (M,2) 与 b (N,2) 两两之间的周期平方距离，形状 (M, N)。"""
+    d = np.abs(a[:, None, :] - b[None, :, :])
+    d = np.minimum(d, np.asarray(shape) - d)
+    return (d * d).sum(axis=2)
+
+
+def find_peaks(mag: np.ndarray, num_peaks: int, min_distance: float = 5, exclude_r: float = 15) -> np.ndarray:
+    """返回最多 num_peaks 个峰值的 (行, 列) 坐标 (k, 2)，按幅值降序；共轭点只保留先出现的一个。"""
+    h, w = mag.shape
+    if num_peaks <= 0:
+        return np.empty((0, 2), dtype=np.int64)
+    is_max = (mag >= _local_max(mag)) & (mag > 0)
+    flat = np.flatnonzero(is_max)
+    ys, xs = np.divmod(flat, w)
+    keep = (ys - h // 2) ** 2 + (xs - w // 2) ** 2 > exclude_r ** 2
+    flat, values = flat[keep], mag.reshape(-1)[flat[keep]]
+
+    limit = min_distance ** 2
+    take = min(flat.size, 8 * num_peaks + 16)
+    while True:
+        top = np.argpartition(values, flat.size - take)[flat.size - take:] if take < flat.size else np.arange(flat.size)
+        order = top[np.argsort(values[top], kind="stable")[::-1]]
+        cand = np.stack(np.divmod(flat[order], w), axis=1)
+        suppressed = np.zeros(len(cand), dtype=bool)
+        chosen = []
+        for i in range(len(cand)):
+            if suppressed[i]:
+                continue
+            chosen.append(i)
+            if len(chosen) == num_peaks:
+                break
+            # 抑制落在该峰值或其共轭点半径内的候选
+            centers = np.stack([cand[i], mirror_points(cand[i:i + 1], (h, w))[0]])
+            suppressed |= (_periodic_dist2(centers, cand, (h, w)) <= limit).any(axis=0)
+        if len(chosen) == num_peaks or take >= flat.size:
+            return cand[chosen]
+        take = min(flat.size, 4 * take)
+
+
+# ========== 陷波掩膜 ==========
+def _profile(dist2: np.ndarray, radius: float, profile: str, order: int) -> np.ndarray:
+    if profile == "ideal":
+        return (dist2 > radius ** 2).astype(np.float32)
+    if profile == "gaussian":
+        return (1.0 - np.exp(-dist2 / (2.0 * radius ** 2))).astype(np.float32)
+    ratio = np.divide(radius ** 2, dist2, out=np.full(dist2.shape, np.inf), where=dist2 > 0)
+    return (1.0 / (1.0 + ratio ** order)).astype(np.float32)
+
+
+def _window_radius(radius: float, profile: str, order: int) -> int:
+    """剖面与 1 的差小于 NOTCH_EPS 的半径，窗口外视为 1。"""
+    if profile == "ideal":
+        return int(np.ceil(radius))
+    if profile == "gaussian":
+        return int(np.ceil(radius * np.sqrt(2.0 * np.log(1.0 / NOTCH_EPS))))
+    return int(np.ceil(radius * (1.0 / NOTCH_EPS - 1.0) ** (1.0 / (2 * order))))
+
+
+def notch_mask(
+    shape: Tuple[int, int],
+    peaks: np.ndarray,
+    radius: float = 5,
+    profile: str = "ideal",
+    order: int = 2,
+) -> np.ndarray:
+    """中心化完整谱尺寸的 float32 掩膜：对每个峰值及其共轭点各乘一个陷波剖面。"""
+    if profile not in PROFILES:
+        raise ValueError(f"未知陷波剖面: {profile}，可选 {PROFILES}")
+    h, w = shape
+    mask = np.ones(shape, dtype=np.float32)
+    if len(peaks) == 0:
+        return mask
+    half = min(_window_radius(radius, profile, order), (min(h, w) - 1) // 2)
+    offsets = np.arange(-half, half + 1)
+    local = _profile((offsets[:, None] ** 2 + offsets[None, :] ** 2).astype(np.float64), radius, profile, order)
+    centers = np.concatenate([peaks, mirror_points(peaks, shape)])
+    for py, px in centers:
+        rows = (py + offsets) % h
+        cols = (px + offsets) % w
+        mask[np.ix_(rows, cols)] *= local
+    return mask
+
+
+def build_notch_mask(
+    mag: np.ndarray,
+    num_peaks: int = 4,
+    radius: float = 5,
+    exclude_r: float = 15,
+    profile: str = "ideal",
+    order: int = 2,
+) -> np.ndarray:
+    """由中心化幅值谱自动选峰并生成陷波掩膜。"""
+    peaks = find_peaks(mag, num_peaks, min_distance=radius, exclude_r=exclude_r)
+    return notch_mask(mag.shape, peaks, radius=radius, profile=profile, order=order)
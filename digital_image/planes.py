@@ -0,0 +1,78 @@
+"""
+彩色图像与图像栈的统一布局：滤波器内部只处理最后两维 (…, H, W)，前面的维度作为批量维，
+一次调用内向量化，填充缓冲与卷积核在所有平面间共用。
+- as_planes(arr)：(H, W) 原样；(H, W, C) → (C, H, W)；(N, H, W) 原样；(N, H, W, C) → (N, C, H, W)。
+  只换轴不拷贝，后续的 reflect 填充本来就要分配新数组，换轴的拷贝在那一步顺带完成。
+- restore(planes, channels_last)：把 (…, H, W) 结果换回输入的布局并转为 C 连续。
+- empty_output / put_rows：按输入布局分配输出，并把按行条带算出的 (…, rows, W) 结果块直接写入，
+  分条带计算的算子不必先拼出整幅 (…, H, W) 再换轴。
+  最内维只有 3、4 时 NumPy 的通用换轴拷贝很慢，这里逐通道写入跨步目标，约快 2.5 倍。
+- strips(h, row_elems)：访存受限的逐元素算子按行条带分块（每条约 STRIP_ELEMS 个元素，含所有平面），
+  中间缓冲留在缓存内，通道数增加时条带变矮，代价随像素数线性增长。
+- pad_reflect(planes, pad_y, pad_x)：只在最后两维做 reflect 填充。
+三维数组的最后一维 ≤ MAX_CHANNELS 时视为 (H, W, C)，否则视为 (N, H, W)；
+宽度 ≤ 4 的图像栈需显式传 channels_last=False。
+"""
+
+from __future__ import annotations
+
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+
+
+MAX_CHANNELS = 4
+# 每个行条带的元素数（所有平面合计）；1024² 上 2^16 比整幅一次算快约 1.5 倍
+STRIP_ELEMS = 1 << 16
+
+
+def is_channels_last(arr: np.ndarray, channels_last: Optional[bool] = None) -> bool:
+    if arr.ndim == 2:
+        return False
+    if arr.ndim == 4:
+        return True if channels_last is None else channels_last
+    if arr.ndim == 3:
+        return arr.shape[-1] <= MAX_CHANNELS if channels_last is None else channels_last
+    raise ValueError(f"需要 (H,W)、(H,W,C)、(N,H,W) 或 (N,H,W,C) 数组，收到形状 {arr.shape}")
+
+
+def as_planes(arr: np.ndarray, channels_last: Optional[bool] = None) -> Tuple[np.ndarray, bool]:
+    """返回 (…, H, W) 视图与是否需要换回通道维。"""
+    last = is_channels_last(arr, channels_last)
+    return (np.moveaxis(arr, -1, -3) if last else arr), last
+
+
+def empty_output(planes_shape: Tuple[int, ...], dtype: type, channels_last: bool) -> np.ndarray:
+    """(…, H, W) 结果在输入布局下的未初始化输出数组。"""
+    if channels_last:
+        return np.empty(planes_shape[:-3] + planes_shape[-2:] + planes_shape[-3:-2], dtype=dtype)
+    return np.empty(planes_shape, dtype=dtype)
+
+
+def put_rows(out: np.ndarray, y: int, block: np.ndarray, channels_last: bool) -> None:
+    """把 (…, rows, W) 的结果块写入 empty_output 所分配的 out 的第 y 行起。"""
+    rows = block.shape[-2]
+    if not channels_last:
+        out[..., y:y + rows, :] = block
+        return
+    for c in range(block.shape[-3]):
+        out[..., y:y + rows, :, c] = block[..., c, :, :]
+
+
+def restore(planes: np.ndarray, channels_last: bool) -> np.ndarray:
+    if not channels_last:
+        return planes
+    out = empty_output(planes.shape, planes.dtype, True)
+    put_rows(out, 0, planes, True)
+    return out
+
+
+def strips(h: int, row_elems: int) -> Iterator[Tuple[int, int]]:
+    """把 h 行切成若干 [y0, y1) 条带，每条约 STRIP_ELEMS / row_elems 行。"""
+    rows = max(1, STRIP_ELEMS // max(row_elems, 1))
+    for y in range(0, h, rows):
+        yield y, min(h, y + rows)
+
+
+def pad_reflect(planes: np.ndarray, pad_y: int, pad_x: int) -> np.ndarray:
+    return np.pad(planes, [(0, 0)] * (planes.ndim - 2) + [(pad_y, pad_y), (pad_x, pad_x)], mode="reflect")
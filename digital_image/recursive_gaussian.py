@@ -0,0 +1,172 @@
+"""
+递归（IIR）高斯平滑：Young–van Vliet 三阶递归滤波，每个像素的代价与 σ 无关。
+- 每个轴先做因果（前向）再做反因果（后向）递推：
+      w[n] = B·x[n] + a1·w[n-1] + a2·w[n-2] + a3·w[n-3]
+      y[n] = B·w[n] + a1·y[n+1] + a2·y[n+2] + a3·y[n+3]
+  递推沿行方向进行，每一步对整行做向量运算（3 抽头用一次 dot），Python 循环次数只与图像边长有关。
+- 边界与 convolution 一致为 reflect：递推前沿该轴 reflect 填充 ceil(4σ)+3 个像素。
+  前向递推以填充区首值、后向递推以前向结果末值作为稳态初值（3 个状态取同一值）；
+  若直接用 3 个不相等的值做初值，σ 大时极点接近 1，初值差会被放大成远超填充区的瞬态。
+- 递推在 float64 中进行：σ=50 时 float32 累积误差约 2 个灰度级，float64 下低于 0.2。
+- 只做平滑，不提供高斯导数：三阶 YvV 的脉冲响应与采样高斯差约 3%（σ=5），对平滑结果再做中心差分时
+  误差被放大到一阶 6–9%、二阶 16–25%，达不到可用精度。需要导数时对平滑结果用 Sobel 等差分算子。
+- gaussian_blur 按 σ 分派：σ < FIR_MAX_SIGMA 时用原来的 FIR 高斯核（小 σ 下 FIR 更准且足够快，
+  与实验三的输出逐位相同），否则用 IIR。
+- (H,W,C) / (N,H,W[,C]) 输入按 planes.py 换轴：递推轴移到最前，其余维度展平成一行，
+  每步的向量运算同时覆盖所有平面，Python 循环次数仍只与边长有关。
+YvV 系数适用于 σ ≥ 0.5；与 FIR 核的误差对比见 accuracy_report / main()。
+用法：python recursive_gaussian.py [--size 1024] [--sigmas 0.8 1.8 5 10 20 50]
+"""
+
+from __future__ import annotations
+
+import argparse
+import math
+import time
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from convolution import convolve, filter2d
+from planes import as_planes, restore
+
+
+IIR_MIN_SIGMA = 0.5
+# gaussian_blur 的切换点：σ 小于该值用 FIR 可分离核（YvV 在 σ=3 时最大误差约 1.5 个灰度级，σ=5 时低于 1）
+FIR_MAX_SIGMA = 5.0
+
+Sigma = Union[float, Tuple[float, float]]
+
+
+# ========== 系数 ==========
+def yvv_coefficients(sigma: float) -> Tuple[float, np.ndarray]:
+    """Young & van Vliet (1995) 的 (B, [a1, a2, a3])，a_k = b_k / b0。"""
+    if sigma < IIR_MIN_SIGMA:
+        raise ValueError(f"递归高斯需要 σ ≥ {IIR_MIN_SIGMA}，收到 {sigma}")
+    if sigma >= 2.5:
+        q = 0.98711 * sigma - 0.96330
+    else:
+        q = 3.97156 - 4.14554 * math.sqrt(1.0 - 0.26891 * sigma)
+    b0 = 1.57825 + 2.44413 * q + 1.4281 * q ** 2 + 0.422205 * q ** 3
+    b1 = 2.44413 * q + 2.85619 * q ** 2 + 1.26661 * q ** 3
+    b2 = -(1.4281 * q ** 2 + 1.26661 * q ** 3)
+    b3 = 0.422205 * q ** 3
+    a = np.array([b1, b2, b3]) / b0
+    return 1.0 - a.sum(), a
+
+
+def _margin(sigma: float) -> int:
+    return int(math.ceil(4.0 * sigma)) + 3
+
+
+# ========== 递推 ==========
+def _recurse(lines: np.ndarray, sigma: float) -> np.ndarray:
+    """沿第 0 轴原地做因果 + 反因果递推；lines 为 C 连续的 float64 (n, m)。"""
+    n, m = lines.shape
+    if n < 4:
+        return lines
+    B, a = yvv_coefficients(sigma)
+    forward = a[::-1].copy()  # 与 lines[i-3:i] 对齐：a3, a2, a1
+    backward = a  # 与 lines[i+1:i+4] 对齐：a1, a2, a3
+    t = np.empty(m, dtype=lines.dtype)
+    lines[1:3] = lines[0]
+    for i in range(3, n):
+        np.dot(forward, lines[i - 3:i], out=t)
+        lines[i] *= B
+        lines[i] += t
+    lines[n - 3:n - 1] = lines[n - 1]
+    for i in range(n - 4, -1, -1):
+        np.dot(backward, lines[i + 1:i + 4], out=t)
+        lines[i] *= B
+        lines[i] += t
+    return lines
+
+
+def _smooth_axis0(src: np.ndarray, sigma: float) -> np.ndarray:
+    """对 src 的第 0 轴做 reflect 填充与递推平滑，返回与 src 同形的 C 连续 float32。
+    src 可以多于两维，其余维度展平后一起递推。"""
+    n, rest = src.shape[0], src.shape[1:]
+    pad = _margin(sigma)
+    lines = np.pad(np.asarray(src, dtype=np.float64), [(pad, pad)] + [(0, 0)] * len(rest), mode="reflect")
+    lines = lines.reshape(n + 2 * pad, -1)
+    _recurse(lines, sigma)
+    return lines[pad:pad + n].reshape(n, *rest).astype(np.float32)
+
+
+def gaussian_iir(gray: np.ndarray, sigma: Sigma) -> np.ndarray:
+    """递归高斯平滑，返回 float32，布局与输入相同；sigma 可为 (σy, σx)。"""
+    planes, channels_last = as_planes(gray)
+    sy, sx = (sigma, sigma) if np.isscalar(sigma) else sigma
+    # 先把 H 轴移到最前沿它递推，再把 W 轴移到最前沿它递推；np.pad 对换轴视图的输出是 C 连续的
+    rows = _smooth_axis0(np.moveaxis(planes, -2, 0), float(sy))
+    cols = _smooth_axis0(np.moveaxis(np.moveaxis(rows, 0, -2), -1, 0), float(sx))
+    out = np.moveaxis(cols, 0, -1)
+    return restore(out, channels_last) if channels_last else np.ascontiguousarray(out)
+
+
+def gaussian_fir_kernel(sigma: float) -> np.ndarray:
+    """实验三使用的 (6σ+1) 方形 FIR 高斯核。"""
+    size = int(6 * sigma + 1)
+    size = size if size % 2 == 1 else size + 1
+    x = np.arange(size) - size // 2
+    g = np.exp(-(x ** 2) / (2 * sigma ** 2))
+    kernel = np.outer(g, g)
+    kernel /= kernel.sum()
+    return kernel.astype(np.float32)
+
+
+def gaussian_blur(gray: np.ndarray, sigma: float) -> np.ndarray:
+    """uint8 高斯平滑：小 σ 用 FIR（与 convolve 结果一致），大 σ 用 IIR 并四舍五入。"""
+    if sigma < FIR_MAX_SIGMA:
+        return convolve(gray, gaussian_fir_kernel(sigma))
+    out = gaussian_iir(gray, sigma)
+    np.rint(out, out=out)
+    np.clip(out, 0, 255, out=out)
+    return out.astype(np.uint8)
+
+
+# ========== 精度报告 ==========
+def accuracy_report(sigmas: Sequence[float], size: int = 1024) -> List[Dict[str, float]]:
+    """对比 IIR 与实验三的 6σ+1 截断 FIR 核（filter2d，σ 大时走 FFT）：最大绝对误差、RMSE 与两者耗时。"""
+    rng = np.random.default_rng(0)
+    ramp = np.add.outer(np.arange(size), np.arange(size)) * (127.0 / (2 * size - 2))
+    img = (rng.integers(0, 128, (size, size)) + ramp).astype(np.uint8)
+    rows: List[Dict[str, float]] = []
+    for sigma in sigmas:
+        kernel = gaussian_fir_kernel(sigma)
+        if kernel.shape[0] // 2 >= size:
+            continue
+        start = time.perf_counter()
+        ref = filter2d(img, kernel)
+        fir_s = time.perf_counter() - start
+        start = time.perf_counter()
+        got = gaussian_iir(img, sigma)
+        iir_s = time.perf_counter() - start
+        err = np.abs(got.astype(np.float64) - ref)
+        rows.append(
+            {
+                "sigma": sigma,
+                "max_abs": float(err.max()),
+                "rmse": float(np.sqrt(np.mean(err ** 2))),
+                "fir_s": fir_s,
+                "iir_s": iir_s,
+            }
+        )
+    return rows
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="递归高斯与 FIR 高斯核的精度、耗时对比")
+    parser.add_argument("--size", type=int, default=1024)
+    parser.add_argument("--sigmas", type=float, nargs="+", default=[0.8, 1.2, 1.8, 3, 5, 10, 20, 50])
+    args = parser.parse_args(argv)
+    print(f"{'σ':>5} {'最大误差':>10} {'RMSE':>10} {'FIR':>10} {'IIR':>10}")
+    for r in accuracy_report(args.sigmas, args.size):
+        print(
+            f"{r['sigma']:>5} {r['max_abs']:10.4f} {r['rmse']:10.4f} "
+            f"{r['fir_s'] * 1e3:8.1f}ms {r['iir_s'] * 1e3:8.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+流式 HTML 报告：边处理边写入，不在内存里拼接整份文档。
+- ReportWriter 打开时写入页头，每个 section 生成后立即追加并 flush，关闭时写页尾。
+- 图片缩略图直接由内存中的 ndarray 生成（PIL thumbnail），不回读、不重新解码已保存的 PNG；
+  assets="external" 时缩略图写到 <报告名>_assets/ 目录并以相对路径引用，
+  assets="inline" 时缩略图以 base64 内嵌（只内嵌缩略图，不内嵌原图）。
+  只给出文件路径的条目用 imgio.load_preview 读取（JPEG 以 draft 模式按缩略图尺寸缩放解码）。
+- <img> 带 loading="lazy" 与宽高属性；给出原图路径时缩略图链接到原图。
+- 也可直接放入内联 SVG（如 histplot.hist_svg 的直方图），或用 table_fragment 生成表格小节。
+报告大小与生成时间只与缩略图数量有关，与原图字节数无关。
+"""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import html
+import io
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, TextIO, Tuple, Union
+
+import numpy as np
+from PIL import Image
+
+from imgio import load_preview
+
+
+# 报告条目：数组；(数组, 原图路径)；已保存的图片路径（会读取该文件生成缩略图）；内联 SVG 字符串
+ReportImage = Union[np.ndarray, Tuple[np.ndarray, Path], Path, str]
+
+THUMB_SIZE = 320
+DISPLAY_WIDTH = 240
+
+_STYLE = """
+    body { font-family: Arial, sans-serif; background:#f8fafc; color:#1f2937; padding:24px; }
+    h1 { margin-bottom:6px; }
+    h3 { margin:12px 0 6px 0; }
+    .subtitle { color:#6b7280; }
+    .item { margin:6px 12px 6px 0; display:inline-block; text-align:center; vertical-align:top; }
+    .item .name { font-size:13px; color:#4b5563; margin-bottom:4px; }
+    .item img { max-width:%dpx; height:auto; border:1px solid #d1d5db; }
+    .section { margin-bottom:16px; }
+    table.data { border-collapse:collapse; font-size:13px; }
+    table.data th, table.data td { border:1px solid #d1d5db; padding:2px 8px; text-align:right; }
+    table.data th:first-child, table.data td:first-child { text-align:left; }
+""" % DISPLAY_WIDTH
+
+
+def make_thumbnail(arr: np.ndarray, size: int = THUMB_SIZE) -> Image.Image:
+    """由 ndarray 生成最长边不超过 size 的缩略图。"""
+    img = Image.fromarray(np.ascontiguousarray(arr))
+    img.thumbnail((size, size), Image.Resampling.BILINEAR, reducing_gap=2.0)
+    return img
+
+
+def encode_thumbnail(img: Image.Image) -> Tuple[bytes, str]:
+    """色阶很少的图（掩膜、位平面）用 PNG，其余用 JPEG。"""
+    buf = io.BytesIO()
+    if img.getcolors(16) is not None:
+        img.save(buf, format="PNG", optimize=False)
+        return buf.getvalue(), "png"
+    img.convert("RGB" if img.mode not in ("L", "RGB") else img.mode).save(buf, format="JPEG", quality=85)
+    return buf.getvalue(), "jpg"
+
+
+class ReportWriter:
+    """流式写 HTML 报告，用法：with ReportWriter(path, title) as report: report.section(...)。"""
+
+    def __init__(
+        self,
+        path: Path,
+        title: str,
+        subtitle: str = "",
+        assets: str = "external",
+        thumb_size: int = THUMB_SIZE,
+    ) -> None:
+        if assets not in ("external", "inline"):
+            raise ValueError("assets 只能是 'external' 或 'inline'")
+        self.path = Path(path)
+        self.title = title
+        self.subtitle = subtitle
+        self.assets = assets
+        self.thumb_size = thumb_size
+        self.asset_dir = self.path.with_name(f"{self.path.stem}_assets")
+        self.assets_used: List[str] = []  # 已引用的缩略图（相对报告目录），供增量构建校验片段
+        self.bytes_written = 0  # 本次新写出的缩略图字节数
+        self._fh: Optional[TextIO] = None
+
+    # ---------- 生命周期 ----------
+    def open(self) -> "ReportWriter":
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if self.assets == "external":
+            self.asset_dir.mkdir(parents=True, exist_ok=True)
+        self._fh = open(self.path, "w", encoding="utf-8")
+        self._fh.write(
+            "<!DOCTYPE html>\n<html lang=\"zh-CN\">\n<head>\n  <meta charset=\"UTF-8\" />\n"
+            f"  <title>{html.escape(self.title)}</title>\n  <style>{_STYLE}  </style>\n</head>\n<body>\n"
+            f"  <h1>{html.escape(self.title)}</h1>\n"
+        )
+        if self.subtitle:
+            self._fh.write(f"  <p class=\"subtitle\">{html.escape(self.subtitle)}</p>\n")
+        self._fh.flush()
+        return self
+
+    def close(self) -> None:
+        if self._fh is not None:
+            self._fh.write("</body>\n</html>\n")
+            self._fh.close()
+            self._fh = None
+
+    def __enter__(self) -> "ReportWriter":
+        return self.open()
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    # ---------- 内容 ----------
+    def _thumb_src(self, arr: np.ndarray) -> Tuple[str, int, int]:
+        thumb = make_thumbnail(arr, self.thumb_size)
+        data, ext = encode_thumbnail(thumb)
+        if self.assets == "inline":
+            mime = "image/png" if ext == "png" else "image/jpeg"
+            return f"data:{mime};base64,{base64.b64encode(data).decode('ascii')}", thumb.width, thumb.height
+        # 以内容哈希命名，重复生成同一缩略图时文件名不变、无需重写
+        dst = self.asset_dir / f"thumb_{hashlib.sha1(data).hexdigest()[:16]}.{ext}"
+        if not dst.exists():
+            dst.write_bytes(data)
+            self.bytes_written += len(data)
+        rel = os.path.relpath(dst, self.path.parent).replace(os.sep, "/")
+        self.assets_used.append(rel)
+        return rel, thumb.width, thumb.height
+
+    def _link(self, full: Path) -> str:
+        return os.path.relpath(Path(full), self.path.parent).replace(os.sep, "/")
+
+    def _item_html(self, name: str, item: ReportImage) -> str:
+        label = html.escape(name)
+        if isinstance(item, str):
+            body = item
+        else:
+            full: Optional[Path] = None
+            if isinstance(item, tuple):
+                arr, full = item
+            elif isinstance(item, Path):
+                full = item
+                arr = load_preview(item, self.thumb_size)
+            else:
+                arr = item
+            src, w, h = self._thumb_src(arr)
+            body = f"<img src='{src}' width='{w}' height='{h}' loading='lazy' alt='{label}'>"
+            if full is not None:
+                body = f"<a href='{html.escape(self._link(full))}'>{body}</a>"
+        return f"<div class='item'><div class='name'>{label}</div>{body}</div>"
+
+    def fragment(self, title: str, images: Dict[str, ReportImage], note: str = "") -> str:
+        """生成一个小节的 HTML（缩略图此时写出），不写入报告。"""
+        blocks = "".join(self._item_html(name, item) for name, item in images.items())
+        note_html = f"<p>{html.escape(note)}</p>" if note else ""
+        return f"  <h3>{html.escape(title)}</h3>{note_html}<div class='section'>{blocks}</div>\n"
+
+    def table_fragment(self, title: str, header: List[str], rows: List[List[str]], note: str = "") -> str:
+        """生成一个表格小节的 HTML（单元格内容会被转义）。"""
+        head = "".join(f"<th>{html.escape(h)}</th>" for h in header)
+        body = "".join("<tr>" + "".join(f"<td>{html.escape(c)}</td>" for c in row) + "</tr>" for row in rows)
+        note_html = f"<p>{html.escape(note)}</p>" if note else ""
+        return f"  <h3>{html.escape(title)}</h3>{note_html}<table class='data'><tr>{head}</tr>{body}</table>\n"
+
+    def section(self, title: str, images: Dict[str, ReportImage], note: str = "") -> None:
+        """追加一个小节并立即写盘。"""
+        self.raw(self.fragment(title, images, note))
+
+    def raw(self, markup: str) -> None:
+        """追加任意 HTML 片段（调用方负责转义）。"""
+        if self._fh is None:
+            raise RuntimeError("ReportWriter 尚未打开")
+        self._fh.write(markup)
+        self._fh.flush()
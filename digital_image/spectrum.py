@@ -0,0 +1,123 @@
+"""
+实值图像的频谱对象：rfft2 只计算并保存一半频谱（约一半的计算量与内存）。
+- Spectrum.of(gray)：正变换按图像内容缓存（小容量 LRU），分解、可视化、陷波与重构共用一次 FFT。
+- dtype=np.complex64 时以 float32 计算（NumPy ≥ 2 的 pocketfft 原生单精度），内存再减半。
+- pad=True 时补零到 5-smooth 快速长度（convolution.next_fast_len），逆变换后裁回原尺寸；
+  补零会改变频率网格，需要与原尺寸频点一一对应的场景（如按峰值位置陷波）保持默认 False。
+- magnitude / phase / log_magnitude 在首次访问时才计算；需要完整、中心化的谱图时用 centered()
+  按共轭对称展开，只对结果做一次 fftshift。
+"""
+
+from __future__ import annotations
+
+import hashlib
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import numpy as np
+
+from convolution import next_fast_len
+
+
+CACHE_ENTRIES = 8
+
+_cache: "OrderedDict[Tuple[str, Tuple[int, ...], str, str, bool], Spectrum]" = OrderedDict()
+
+
+def _real_dtype(dtype: np.dtype) -> np.dtype:
+    return np.dtype(np.float32) if np.dtype(dtype) == np.complex64 else np.dtype(np.float64)
+
+
+class Spectrum:
+    """二维实信号的半频谱，data 形状为 (H', W'//2 + 1)，H'、W' 为（补零后的）变换尺寸。"""
+
+    def __init__(self, data: np.ndarray, shape: Tuple[int, int], fft_shape: Tuple[int, int]) -> None:
+        self.data = data
+        self.shape = shape
+        self.fft_shape = fft_shape
+        self._magnitude: Optional[np.ndarray] = None
+        self._phase: Optional[np.ndarray] = None
+
+    # ---------- 构造 ----------
+    @classmethod
+    def compute(cls, gray: np.ndarray, dtype: np.dtype = np.complex128, pad: bool = False) -> "Spectrum":
+        """不经缓存直接做正变换。"""
+        shape = (gray.shape[0], gray.shape[1])
+        fft_shape = (next_fast_len(shape[0]), next_fast_len(shape[1])) if pad else shape
+        real = np.asarray(gray, dtype=_real_dtype(dtype))
+        data = np.fft.rfft2(real, s=fft_shape).astype(dtype, copy=False)
+        return cls(data, shape, fft_shape)
+
+    @classmethod
+    def of(cls, gray: np.ndarray, dtype: np.dtype = np.complex128, pad: bool = False) -> "Spectrum":
+        """按图像内容缓存的正变换；同一图像重复调用只算一次 FFT。"""
+        arr = np.ascontiguousarray(gray)
+        digest = hashlib.blake2b(arr.data, digest_size=16).hexdigest()
+        key = (digest, arr.shape, arr.dtype.str, np.dtype(dtype).str, pad)
+        spec = _cache.get(key)
+        if spec is None:
+            spec = cls.compute(arr, dtype, pad)
+            _cache[key] = spec
+            while len(_cache) > CACHE_ENTRIES:
+                _cache.popitem(last=False)
+        else:
+            _cache.move_to_end(key)
+        return spec
+
+    @classmethod
+    def from_polar(cls, magnitude: np.ndarray, phase: np.ndarray, like: "Spectrum") -> "Spectrum":
+        """由半频谱的幅值与相位重建复数谱（cos/sin 写入实部、虚部，不经过 exp(1j·φ)）。"""
+        data = np.empty(like.data.shape, dtype=like.data.dtype)
+        np.multiply(magnitude, np.cos(phase), out=data.real)
+        np.multiply(magnitude, np.sin(phase), out=data.imag)
+        return cls(data, like.shape, like.fft_shape)
+
+    # ---------- 惰性分量 ----------
+    @property
+    def magnitude(self) -> np.ndarray:
+        if self._magnitude is None:
+            self._magnitude = np.abs(self.data)
+        return self._magnitude
+
+    @property
+    def phase(self) -> np.ndarray:
+        if self._phase is None:
+            self._phase = np.angle(self.data)
+        return self._phase
+
+    @property
+    def log_magnitude(self) -> np.ndarray:
+        return np.log1p(self.magnitude)
+
+    # ---------- 完整谱 ----------
+    def centered(self, half: np.ndarray, odd: bool = False) -> np.ndarray:
+        """把半谱上的实值量（幅值、相位等）按共轭对称展开为完整谱并中心化。
+        odd=True 表示该量在共轭点取相反数（如相位）。"""
+        h, w = self.fft_shape
+        wh = half.shape[1]
+        full = np.empty((h, w), dtype=half.dtype)
+        full[:, :wh] = half
+        mirror = half[(-np.arange(h)) % h][:, w - np.arange(wh, w)]
+        full[:, wh:] = -mirror if odd else mirror
+        return np.fft.fftshift(full)
+
+    def half_mask(self, mask: np.ndarray) -> np.ndarray:
+        """把中心化的完整谱掩膜转换为半谱掩膜。
+        先与其共轭镜像取平均：对非对称掩膜，结果与"完整谱相乘后取逆变换实部"一致。"""
+        h, w = self.fft_shape
+        wh = self.data.shape[1]
+        m = np.fft.ifftshift(mask)
+        mirror = m[(-np.arange(h)) % h][:, (-np.arange(wh)) % w]
+        return 0.5 * (m[:, :wh] + mirror)
+
+    # ---------- 逆变换 ----------
+    def inverse(self, mask: Optional[np.ndarray] = None) -> np.ndarray:
+        """逆变换回空域并裁回原尺寸；mask 为半谱形状的实数掩膜。"""
+        data = self.data if mask is None else self.data * mask
+        img = np.fft.irfft2(data, s=self.fft_shape)
+        return img[: self.shape[0], : self.shape[1]]
+
+
+def to_uint8(img: np.ndarray) -> np.ndarray:
+    """四舍五入到 uint8：无损重构时恰好得到原灰度（截断会因 ±1e-12 的误差差 1）。"""
+    return np.clip(np.rint(img), 0, 255).astype(np.uint8)
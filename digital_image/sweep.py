@@ -0,0 +1,70 @@
+"""
+参数扫描：同一输入按一组参数多次调用算子时，与参数无关的部分只算一次。
+- sweep(fn, arr, grid, **fixed) 返回 (N, …) 结果栈，第 i 个结果等于 fn(arr, **fixed, **points[i])，
+  points = param_grid(grid)；grid 为 {参数名: 取值序列}，多个参数时取笛卡尔积（先列出的参数变化最慢）。
+- 登记过的 (算子, 参数) 由对应的 *_many 函数一次算完该参数的所有取值：
+  sobel_sharpen / alpha   梯度幅值与最大值只算一次，每个 α 只做缩放、叠加与裁剪；
+  mean_filter / ksize     按最大窗口建一次积分图，每个 k 只做 4 次查表与整除；
+  实验二的 gamma_transform / gamma 在 experiment2 中登记（多张 LUT 打包后一次查表）。
+  扫描多个参数时，其余参数的每种组合调用一次 *_many。
+- 其余算子逐点调用后堆叠。中值滤波的直方图逐行更新依赖核高、FIR 高斯各 σ 的核与填充量都不同，
+  能共用的只有输入本身，不登记。
+所有路径与逐点调用的结果逐位一致。
+"""
+
+from __future__ import annotations
+
+import itertools
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from gradient import sobel_sharpen, sobel_sharpen_many
+from integral import mean_filter, mean_filter_many
+
+
+# many(arr, values, **fixed) -> (len(values), …) 结果栈
+Many = Callable[..., np.ndarray]
+
+_REGISTRY: Dict[Tuple[Callable[..., Any], str], Many] = {}
+
+
+def register(fn: Callable[..., Any], param: str, many: Many) -> None:
+    """登记 fn 沿 param 扫描时的批量实现。"""
+    _REGISTRY[(fn, param)] = many
+
+
+def param_grid(grid: Mapping[str, Sequence[Any]]) -> List[Dict[str, Any]]:
+    """展开参数网格，顺序与 sweep 返回的结果栈一致。"""
+    names = list(grid)
+    return [dict(zip(names, combo)) for combo in itertools.product(*(grid[n] for n in names))]
+
+
+def _batched_param(fn: Callable[..., Any], grid: Mapping[str, Sequence[Any]]) -> Optional[str]:
+    return next((name for name in grid if (fn, name) in _REGISTRY), None)
+
+
+def sweep(fn: Callable[..., Any], arr: np.ndarray, grid: Mapping[str, Sequence[Any]], **fixed: Any) -> np.ndarray:
+    """按参数网格调用 fn(arr, **fixed, **point)，返回 (N, …) 结果栈。"""
+    points = param_grid(grid)
+    if not points:
+        raise ValueError("参数网格为空")
+    name = _batched_param(fn, grid)
+    if name is None:
+        return np.stack([np.asarray(fn(arr, **fixed, **p)) for p in points])
+    many = _REGISTRY[(fn, name)]
+    # 其余参数的每种组合为一组，组内只有 name 变化
+    groups: Dict[Tuple[Tuple[str, Any], ...], List[int]] = {}
+    for i, p in enumerate(points):
+        groups.setdefault(tuple((k, v) for k, v in p.items() if k != name), []).append(i)
+    out: Optional[np.ndarray] = None
+    for rest, indices in groups.items():
+        stack = many(arr, [points[i][name] for i in indices], **fixed, **dict(rest))
+        if out is None:
+            out = np.empty((len(points),) + stack.shape[1:], dtype=stack.dtype)
+        out[indices] = stack
+    return out
+
+
+register(sobel_sharpen, "alpha", sobel_sharpen_many)
+register(mean_filter, "ksize", mean_filter_many)
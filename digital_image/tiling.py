@@ -0,0 +1,277 @@
+"""
+分块（tile）执行器：在有限内存下处理超大图像。
+- 图像按方块切分，每块向外多取 halo 像素的上下文，算子在“块 + halo”上运行后裁掉 halo。
+  halo 不小于算子半径时，块内结果与整图计算逐像素一致；位于图像边界的块不取 halo，
+  由算子自身的 reflect 填充处理，与整图时的边界行为相同。
+- 输入可以是 ndarray、.npy 文件（按行带重新映射，只触碰需要的页）或普通图片
+  （先转存为 .npy；PIL 解码 JPEG 时仍需整图内存，严格受限场景请先离线转换）。
+- 输出写入 .npy 内存映射文件，按行带打开、写完即 flush 并解除映射，常驻内存与图像总尺寸无关。
+- 块边长由 memory_budget 与算子每像素工作内存估算得到。
+- 依赖全局量的算子（Sobel 锐化的幅值最大值）分两遍：先分块归约全局量，再分块映射。
+用法：python tiling.py 输入图像 输出.npy --op median:15 --op gamma:1.5,0.5 --budget-mb 256
+"""
+
+from __future__ import annotations
+
+import argparse
+import math
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from PIL import Image
+
+from convolution import convolve
+from gradient import apply_sharpen, sobel_magnitude
+from integral import mean_filter
+from median import median_filter
+
+
+Source = Union[np.ndarray, Path, str]
+Region = Tuple[slice, slice]
+
+DEFAULT_BUDGET = 256 * 2 ** 20
+
+
+# ========== 算子描述 ==========
+@dataclass
+class TileOp:
+    """分块算子：fn 作用于“块 + halo”，halo 为单侧所需上下文像素数。"""
+
+    name: str
+    fn: Callable[[np.ndarray], np.ndarray]
+    halo: int = 0
+    # 算子在块上运行时每个像素的额外工作内存（字节），用于由预算推算块大小
+    work_bytes_per_pixel: int = 16
+
+
+def point_op(name: str, fn: Callable[[np.ndarray], np.ndarray]) -> TileOp:
+    """逐像素算子（如 gamma 变换），无需 halo。"""
+    return TileOp(name, fn, halo=0, work_bytes_per_pixel=8)
+
+
+def local_op(name: str, fn: Callable[[np.ndarray], np.ndarray], halo: int, work_bytes_per_pixel: int = 16) -> TileOp:
+    return TileOp(name, fn, halo=halo, work_bytes_per_pixel=work_bytes_per_pixel)
+
+
+def convolve_op(kernel: np.ndarray, method: str = "auto") -> TileOp:
+    """卷积算子；需要逐位一致时请用 direct / separable，FFT 路径的舍入依赖块尺寸。"""
+    halo = max(kernel.shape) // 2
+    return local_op(f"convolve{kernel.shape}", lambda t: convolve(t, kernel, method=method), halo, 12)
+
+
+def median_op(ksize: int) -> TileOp:
+    return local_op(f"median{ksize}", lambda t: median_filter(t, ksize), ksize // 2, 4)
+
+
+def mean_op(ksize: int) -> TileOp:
+    return local_op(f"mean{ksize}", lambda t: mean_filter(t, ksize), ksize // 2, 12)
+
+
+def chain(ops: Sequence[TileOp]) -> TileOp:
+    """把若干局部算子串成一个：halo 相加，每块只读一次。"""
+    def run(tile: np.ndarray) -> np.ndarray:
+        for op in ops:
+            tile = op.fn(tile)
+        return tile
+
+    return TileOp(
+        "+".join(op.name for op in ops),
+        run,
+        halo=sum(op.halo for op in ops),
+        work_bytes_per_pixel=max(op.work_bytes_per_pixel for op in ops),
+    )
+
+
+# ========== 输入与输出 ==========
+def image_to_npy(path: Path, npy_path: Path, mode: str = "L") -> Path:
+    """把普通图片解码后转存为 .npy，之后可按行带映射读取。"""
+    with Image.open(path) as img:
+        arr = np.asarray(img.convert(mode))
+    out = np.lib.format.open_memmap(npy_path, mode="w+", dtype=arr.dtype, shape=arr.shape)
+    out[...] = arr
+    out.flush()
+    del out
+    return npy_path
+
+
+class _Reader:
+    """统一的块读取接口：ndarray 直接切片，.npy 每次重新映射，读完即释放映射。"""
+
+    def __init__(self, src: Source) -> None:
+        if isinstance(src, np.ndarray):
+            self.array: Optional[np.ndarray] = src
+            self.path: Optional[Path] = None
+            self.shape, self.dtype = src.shape, src.dtype
+        else:
+            self.array = None
+            self.path = Path(src)
+            probe = np.load(self.path, mmap_mode="r")
+            self.shape, self.dtype = probe.shape, probe.dtype
+            del probe
+
+    def read(self, region: Region) -> np.ndarray:
+        if self.array is not None:
+            return np.array(self.array[region])
+        mapped = np.load(self.path, mmap_mode="r")
+        tile = np.array(mapped[region])
+        del mapped
+        return tile
+
+
+class _Writer:
+    """输出写入器：out_path 为 None 时写入内存数组，否则写 .npy 并按行带映射。"""
+
+    def __init__(self, shape: Tuple[int, ...], dtype: np.dtype, out_path: Optional[Path]) -> None:
+        self.shape, self.dtype, self.path = shape, np.dtype(dtype), out_path
+        if out_path is None:
+            self.array: Optional[np.ndarray] = np.empty(shape, dtype=dtype)
+            self.offset = 0
+        else:
+            self.array = None
+            created = np.lib.format.open_memmap(out_path, mode="w+", dtype=dtype, shape=shape)
+            self.offset = created.offset
+            del created
+
+    def band(self, y0: int, y1: int) -> np.ndarray:
+        if self.array is not None:
+            return self.array[y0:y1]
+        row_bytes = self.dtype.itemsize * int(np.prod(self.shape[1:]))
+        return np.memmap(
+            self.path, dtype=self.dtype, mode="r+", offset=self.offset + y0 * row_bytes, shape=(y1 - y0,) + self.shape[1:]
+        )
+
+    def result(self) -> np.ndarray:
+        if self.array is not None:
+            return self.array
+        return np.load(self.path, mmap_mode="r")
+
+
+# ========== 执行器 ==========
+class TiledExecutor:
+    """按内存预算切块执行 TileOp，结果与整图计算一致。"""
+
+    def __init__(self, memory_budget: int = DEFAULT_BUDGET, tile_size: Optional[int] = None) -> None:
+        self.memory_budget = memory_budget
+        self.tile_size = tile_size
+
+    def _tile_side(self, op: TileOp, itemsize: int) -> int:
+        if self.tile_size is not None:
+            return self.tile_size
+        # 每个块像素：输入副本 + 输出 + 算子工作内存；halo 占用按边长近似扣除
+        per_pixel = 2 * itemsize + op.work_bytes_per_pixel
+        side = int(math.sqrt(self.memory_budget / per_pixel)) - 2 * op.halo
+        return max(side, 16)
+
+    def tiles(self, shape: Tuple[int, ...], side: int, halo: int) -> Iterator[Tuple[Region, Region, Region]]:
+        """依次产生 (输出区域, 带 halo 的输入区域, 输入块内的裁剪区域)，按行带顺序。"""
+        h, w = shape[:2]
+        for y0 in range(0, h, side):
+            y1 = min(y0 + side, h)
+            for x0 in range(0, w, side):
+                x1 = min(x0 + side, w)
+                iy0, iy1 = max(y0 - halo, 0), min(y1 + halo, h)
+                ix0, ix1 = max(x0 - halo, 0), min(x1 + halo, w)
+                yield (
+                    (slice(y0, y1), slice(x0, x1)),
+                    (slice(iy0, iy1), slice(ix0, ix1)),
+                    (slice(y0 - iy0, y1 - iy0), slice(x0 - ix0, x1 - ix0)),
+                )
+
+    def map(self, src: Source, op: TileOp, out_path: Optional[Path] = None, out_dtype: type = np.uint8) -> np.ndarray:
+        """分块执行 op，返回结果数组（out_path 给定时为只读内存映射）。"""
+        reader = _Reader(src)
+        writer = _Writer(reader.shape, out_dtype, Path(out_path) if out_path else None)
+        side = self._tile_side(op, reader.dtype.itemsize)
+        band_y0, band = None, None
+        for out_region, in_region, crop in self.tiles(reader.shape, side, op.halo):
+            y0 = out_region[0].start
+            if y0 != band_y0:
+                if band is not None and isinstance(band, np.memmap):
+                    band.flush()
+                del band
+                band_y0, band = y0, writer.band(y0, out_region[0].stop)
+            result = op.fn(reader.read(in_region))
+            band[:, out_region[1]] = result[crop]
+        if isinstance(band, np.memmap):
+            band.flush()
+        del band
+        return writer.result()
+
+    def reduce(
+        self,
+        src: Source,
+        op: TileOp,
+        combine: Callable[[object, object], object],
+        initial: object,
+    ) -> object:
+        """分块执行 op（返回块内裁剪后的数组），并用 combine 把各块结果归约成一个值。"""
+        reader = _Reader(src)
+        side = self._tile_side(op, reader.dtype.itemsize)
+        acc = initial
+        for _, in_region, crop in self.tiles(reader.shape, side, op.halo):
+            acc = combine(acc, op.fn(reader.read(in_region))[crop])
+        return acc
+
+
+# ========== 两遍算子：Sobel 锐化 ==========
+def tiled_sobel_sharpen(
+    src: Source, alpha: float, executor: Optional[TiledExecutor] = None, out_path: Optional[Path] = None
+) -> np.ndarray:
+    """分块 Sobel 锐化：第一遍归约幅值最大值，第二遍逐块锐化（逐像素运算与 gradient.sobel_sharpen 相同）。"""
+    executor = executor or TiledExecutor()
+    mag_op = local_op("sobel_mag", sobel_magnitude, halo=1, work_bytes_per_pixel=16)
+    mag_max = executor.reduce(src, mag_op, lambda acc, mag: max(acc, float(mag.max())), 0.0)
+
+    def sharpen(tile: np.ndarray) -> np.ndarray:
+        return apply_sharpen(tile, sobel_magnitude(tile), alpha, mag_max)
+
+    return executor.map(src, local_op(f"sobel_sharpen{alpha}", sharpen, halo=1, work_bytes_per_pixel=16), out_path)
+
+
+# ========== 命令行 ==========
+def parse_op(spec: str) -> TileOp:
+    """解析 name:args，例如 median:15、mean:11、gauss:1.8、gamma:1.5,0.5。"""
+    name, _, args = spec.partition(":")
+    if name == "median":
+        return median_op(int(args))
+    if name == "mean":
+        return mean_op(int(args))
+    if name == "gauss":
+        from recursive_gaussian import gaussian_fir_kernel
+
+        return convolve_op(gaussian_fir_kernel(float(args)), method="separable")
+    if name == "gamma":
+        from experiment2 import gamma_transform
+
+        c, gamma = (float(v) for v in args.split(","))
+        return point_op(f"gamma{gamma}", lambda t: gamma_transform(t, c=c, gamma=gamma))
+    raise ValueError(f"未知算子: {spec}")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="分块处理超大灰度图像")
+    parser.add_argument("src", type=Path, help="输入图像或 .npy")
+    parser.add_argument("dst", type=Path, help="输出 .npy（内存映射写入）")
+    parser.add_argument("--op", action="append", default=[], help="算子，可重复，按顺序串联")
+    parser.add_argument("--sobel", type=float, default=None, help="最后追加 Sobel 锐化，参数为 alpha")
+    parser.add_argument("--budget-mb", type=float, default=DEFAULT_BUDGET / 2 ** 20)
+    parser.add_argument("--tile", type=int, default=None, help="手动指定块边长")
+    args = parser.parse_args(argv)
+
+    src: Source = args.src
+    if args.src.suffix.lower() != ".npy":
+        src = image_to_npy(args.src, args.dst.with_suffix(".src.npy"))
+    executor = TiledExecutor(int(args.budget_mb * 2 ** 20), args.tile)
+    if args.op:
+        stage_path = args.dst if args.sobel is None else args.dst.with_suffix(".stage.npy")
+        executor.map(src, chain([parse_op(s) for s in args.op]), stage_path)
+        src = stage_path
+    if args.sobel is not None:
+        tiled_sobel_sharpen(src, args.sobel, executor, args.dst)
+    print(f"输出完成：{args.dst}")
+
+
+if __name__ == "__main__":
+    main()